@@ -1,22 +1,19 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
 import os
 import sys
-from datetime import datetime, timedelta
+import math
 import plotly.express as px
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.feather as feather
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from data_pipeline.pipeline import DataPipeline
-from models.arima_model import ARIMAModel
-from models.prophet_model import ProphetModel
-from models.lstm_model import LSTMModel
-
 # Set page configuration
 st.set_page_config(
     page_title="Smart Health AI Engine",
@@ -50,6 +47,7 @@ st.markdown("""
         padding: 10px;
         border-radius: 5px;
         font-weight: bold;
+        margin-bottom: 10px;
     }
     .alert-medium {
         color: white;
@@ -57,6 +55,7 @@ st.markdown("""
         padding: 10px;
         border-radius: 5px;
         font-weight: bold;
+        margin-bottom: 10px;
     }
     .alert-low {
         color: white;
@@ -64,94 +63,422 @@ st.markdown("""
         padding: 10px;
         border-radius: 5px;
         font-weight: bold;
+        margin-bottom: 10px;
     }
 </style>
 """, unsafe_allow_html=True)
 
+# Maximum number of rows shown at once in the raw data viewer
+RAW_DATA_MAX_ROWS = 5000
+
+# Schema metadata marking a memory-mapped data file written in the layout load_data expects
+ARROW_LAYOUT_KEY = b'dashboard_layout'
+ARROW_LAYOUT = b'sorted:region,date;categorical;nan-values'
+
+# Column types for the CSV fallback; string key columns are read straight into categoricals
+CSV_COLUMN_TYPES = {
+    'date': pa.timestamp('ns'),
+    'region': pa.dictionary(pa.int32(), pa.string()),
+    'model': pa.dictionary(pa.int32(), pa.string())
+}
+
 # Helper functions
-@st.cache_data(ttl=3600)
+def read_table(base_path):
+    """Read a table from Parquet if available, falling back to CSV. Returns None if neither exists."""
+    parquet_path = f"{base_path}.parquet"
+    csv_path = f"{base_path}.csv"
+    
+    if os.path.exists(parquet_path):
+        return pd.read_parquet(parquet_path, engine='pyarrow')
+    elif os.path.exists(csv_path):
+        # Arrow's multi-threaded CSV reader with explicit types avoids per-row date inference
+        table = pa_csv.read_csv(
+            csv_path,
+            read_options=pa_csv.ReadOptions(use_threads=True, block_size=1 << 20),
+            convert_options=pa_csv.ConvertOptions(column_types=CSV_COLUMN_TYPES)
+        )
+        return table.to_pandas()
+    return None
+
+def set_categorical_columns(df):
+    """Store the low-cardinality `region` and `model` columns as categoricals for faster filtering and grouping."""
+    for col in ('region', 'model'):
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return df
+
+def categorical_mask(column, values):
+    """Boolean mask of rows whose categorical value is in `values`, compared on the integer codes."""
+    selected_codes = column.cat.categories.get_indexer(values)
+    return np.isin(column.cat.codes.to_numpy(), selected_codes[selected_codes >= 0])
+
+def downcast_numeric_columns(df):
+    """Narrow float64/int64 columns to the smallest float/integer type that holds their values."""
+    for col in df.select_dtypes(include='float64').columns:
+        df[col] = pd.to_numeric(df[col], downcast='float')
+    for col in df.select_dtypes(include='int64').columns:
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
+
+def has_arrow_layout(arrow_path):
+    """Whether an Arrow file was written in the current layout (reads only the file footer)."""
+    try:
+        metadata = pa.ipc.open_file(arrow_path).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return False
+    return metadata.get(ARROW_LAYOUT_KEY) == ARROW_LAYOUT
+
+@st.cache_resource(ttl=3600)
 def load_data():
-    """Load processed data from CSV or run the pipeline if not available."""
-    data_path = "../data/processed_data.csv"
+    """
+    Load processed data, shared by all sessions instead of copied per session.
     
-    if os.path.exists(data_path):
-        data = pd.read_csv(data_path, parse_dates=['date'])
-        return data
-    else:
-        # Run the pipeline to generate data
-        pipeline = DataPipeline()
-        data = pipeline.run_pipeline()
-        return data
+    The data is memory-mapped from an uncompressed Arrow (Feather v2) file, which is
+    written once, sorted by region and date, from Parquet/CSV (or the pipeline output) and refreshed
+    when the source is newer. The returned DataFrame must not be mutated.
+    
+    Returns a (data, fingerprint) pair; the fingerprint changes whenever the file is rewritten, so it
+    can key caches derived from the data.
+    """
+    base_path = "../data/processed_data"
+    arrow_path = f"{base_path}.arrow"
+    
+    source_mtime = max((os.path.getmtime(f"{base_path}{ext}") for ext in ('.parquet', '.csv')
+                        if os.path.exists(f"{base_path}{ext}")), default=0)
+    
+    if (not os.path.exists(arrow_path) or os.path.getmtime(arrow_path) < source_mtime
+            or not has_arrow_layout(arrow_path)):
+        data = read_table(base_path)
+        
+        if data is None:
+            # Run the pipeline to generate data (imported here so normal loads skip its import cost)
+            from data_pipeline.pipeline import DataPipeline
+            pipeline = DataPipeline()
+            data = pipeline.run_pipeline()
+        
+        # Sort once at write time, so every per-region slice of the mapped frame is already in date order
+        # without copying it after the read, and store counts as float32/narrow ints so the file is half the size
+        data = downcast_numeric_columns(set_categorical_columns(data)).sort_values(['region', 'date'], ignore_index=True)
+        table = pa.Table.from_pandas(data, preserve_index=False)
+        
+        # Keep NaN as a float value instead of an Arrow null: only null-free columns convert to pandas
+        # as views of the mapped buffers, so the frame read back shares the file's memory
+        for name in data.select_dtypes(include='floating').columns:
+            table = table.set_column(table.schema.get_field_index(name), name,
+                                     pa.array(data[name].to_numpy(), from_pandas=False))
+        table = table.replace_schema_metadata({**table.schema.metadata, ARROW_LAYOUT_KEY: ARROW_LAYOUT})
+        feather.write_feather(table, arrow_path, compression='uncompressed')
+    
+    # Regions are stored as dictionaries, so they come back as categoricals without a conversion copy
+    table = feather.read_table(arrow_path, memory_map=True)
+    arrow_stat = os.stat(arrow_path)
+    data_fingerprint = f"{arrow_stat.st_mtime_ns}-{arrow_stat.st_size}"
+    return table.to_pandas(split_blocks=True, self_destruct=False), data_fingerprint
 
 @st.cache_data(ttl=3600)
 def load_forecasts(horizon=14):
-    """Load forecasts from CSV."""
-    forecast_path = f"../data/forecast_{horizon}day.csv"
+    """
+    Load forecasts from Parquet/CSV.
+    
+    Returns a (forecasts, fingerprint) pair; the fingerprint is a hash of the forecast contents, so
+    caches keyed on it are invalidated by retraining even when the row count is unchanged.
+    """
+    forecasts = read_table(f"../data/forecast_{horizon}day")
     
-    if os.path.exists(forecast_path):
-        forecasts = pd.read_csv(forecast_path, parse_dates=['date'])
-        return forecasts
+    if forecasts is not None:
+        # Sort once so every per-region/model slice is already in horizon order
+        forecasts = downcast_numeric_columns(set_categorical_columns(forecasts))
+        forecasts = forecasts.sort_values(['region', 'model', 'forecast_horizon'], ignore_index=True)
+        forecast_fingerprint = f"{horizon}-{pd.util.hash_pandas_object(forecasts, index=False).sum()}"
+        return forecasts, forecast_fingerprint
     else:
         st.warning(f"No forecasts found for {horizon}-day horizon. Please run model training first.")
-        return pd.DataFrame()
+        return pd.DataFrame(), f"{horizon}-empty"
 
-def calculate_outbreak_risk(forecasts, actual, threshold_factor=1.5):
-    """Calculate outbreak risk based on forecasts vs historical average."""
+@st.cache_data(ttl=3600)
+def calculate_historical_stats(_data, data_fingerprint):
+    """
+    Calculate historical case average and standard deviation per region.
+    
+    The frame itself is not hashed by Streamlit; `data_fingerprint` identifies it in the cache,
+    so only the threshold arithmetic in calculate_outbreak_risk reruns on slider changes.
+    """
+    return _data.groupby('region', sort=False, observed=True)['cases_cases'].agg(
+        historical_avg='mean', historical_std='std'
+    )
+
+def calculate_outbreak_risk(forecasts, historical, threshold_factor=1.5):
+    """Calculate outbreak risk based on forecasts vs per-region historical statistics."""
     if forecasts.empty:
         return pd.DataFrame()
     
-    risk_data = []
+    # Calculate maximum forecast for every region/model pair
+    max_forecasts = (
+        forecasts.groupby(['region', 'model'], sort=False, observed=True)['forecast']
+        .max()
+        .rename('max_forecast')
+        .reset_index()
+    )
+    
+    # Regions without historical data are dropped by the inner join
+    risk_data = max_forecasts.merge(historical, left_on='region', right_index=True, how='inner')
+    
+    if risk_data.empty:
+        return pd.DataFrame()
+    
+    # Calculate threshold for outbreak
+    risk_data['outbreak_threshold'] = risk_data['historical_avg'] + threshold_factor * risk_data['historical_std']
+    
+    # Calculate risk probability (simplified); default to 0.5 if no variation in historical data
+    z_score = (risk_data['max_forecast'] - risk_data['historical_avg']) / risk_data['historical_std']
+    risk_data['risk_probability'] = np.clip((z_score - 1) / 3, 0.0, 1.0).where(risk_data['historical_std'] > 0, 0.5)
+    
+    # Determine risk level
+    risk_data['risk_level'] = pd.cut(
+        risk_data['risk_probability'],
+        bins=[-np.inf, 0.4, 0.7, np.inf],
+        labels=['Low', 'Medium', 'High'],
+        right=False
+    ).astype(str)
     
-    for region in forecasts['region'].unique():
-        region_forecasts = forecasts[forecasts['region'] == region]
-        region_actual = actual[actual['region'] == region]
+    return risk_data[['region', 'model', 'max_forecast', 'historical_avg',
+                      'outbreak_threshold', 'risk_probability', 'risk_level']]
+
+@st.cache_data(ttl=3600)
+def calculate_selection_risk(_forecasts, _historical, regions, models, threshold_factor,
+                             data_fingerprint, forecast_fingerprint):
+    """
+    Cached calculate_outbreak_risk for one region/model selection and threshold.
+    
+    The frames are not hashed; the sorted selection tuples, threshold and fingerprints key the cache,
+    so revisiting a selection or slider position skips the groupby entirely.
+    """
+    return calculate_outbreak_risk(_forecasts, _historical, threshold_factor)
+
+@st.cache_resource(ttl=3600, show_spinner=False)
+def build_forecast_figure(_region_view, _filtered_forecasts, plot_regions, models, forecast_horizon,
+                          data_fingerprint, forecast_fingerprint):
+    """
+    Build the faceted Tab 2 forecast figure for the given regions and models.
+    
+    The frames are not hashed; the region/model tuples, horizon and fingerprints key the cache, so reruns
+    triggered by unrelated widgets reuse the figure. The returned figure is shared and must not be modified.
+    """
+    plot_regions = list(plot_regions)
+    
+    # Build a single long-form frame with actual and forecast cases for all regions
+    actual_long = (
+        pd.concat([_region_view[region] for region in plot_regions])
+        [['date', 'region', 'cases_cases']]
+        .rename(columns={'cases_cases': 'cases'})
+        .assign(series='Actual Cases')
+    )
+    forecast_long = (
+        _filtered_forecasts[['date', 'region', 'model', 'forecast']]
+        .rename(columns={'forecast': 'cases'})
+    )
+    forecast_long['series'] = forecast_long.pop('model').astype(str) + ' Forecast'
+    long_data = pd.concat([actual_long, forecast_long], ignore_index=True)
+    
+    # Create one figure with a facet row per region
+    fig = px.line(
+        long_data,
+        x='date',
+        y='cases',
+        color='series',
+        facet_row='region',
+        category_orders={'region': plot_regions},
+        color_discrete_map={'Actual Cases': 'black'},
+        markers=True,
+        labels={'date': 'Date', 'cases': 'Cases', 'series': 'Data Source', 'region': 'Region'},
+        height=500 * len(plot_regions)
+    )
+    fig.for_each_trace(
+        lambda trace: trace.update(line=dict(width=2) if trace.name == 'Actual Cases' else dict(dash='dash'))
+    )
+    fig.for_each_annotation(lambda annotation: annotation.update(text=annotation.text.split('=')[-1]))
+    fig.update_yaxes(matches=None)
+    
+    # Add prediction intervals if available
+    if 'forecast_lower' in _filtered_forecasts.columns and 'forecast_upper' in _filtered_forecasts.columns:
+        intervals = _filtered_forecasts.dropna(subset=['forecast_lower', 'forecast_upper'])
+        interval_traces, interval_rows, interval_names = [], [], set()
         
-        if region_actual.empty:
-            continue
+        for (region, model), model_data in intervals.groupby(['region', 'model'], sort=False, observed=True):
+            # Plotly Express numbers facet rows from the bottom up
+            row = len(plot_regions) - plot_regions.index(region)
+            interval_name = f'{model} Prediction Interval'
+            
+            interval_traces.append(go.Scatter(
+                x=model_data['date'],
+                y=model_data['forecast_upper'],
+                mode='lines',
+                line=dict(width=0),
+                legendgroup=interval_name,
+                showlegend=False
+            ))
+            interval_traces.append(go.Scatter(
+                x=model_data['date'],
+                y=model_data['forecast_lower'],
+                mode='lines',
+                line=dict(width=0),
+                fill='tonexty',
+                fillcolor='rgba(0, 176, 246, 0.2)',
+                name=interval_name,
+                legendgroup=interval_name,
+                showlegend=interval_name not in interval_names
+            ))
+            interval_rows += [row, row]
+            interval_names.add(interval_name)
         
-        # Calculate historical average and standard deviation
-        historical_avg = region_actual['cases_cases'].mean()
-        historical_std = region_actual['cases_cases'].std()
+        if interval_traces:
+            fig.add_traces(interval_traces, rows=interval_rows, cols=[1] * len(interval_rows))
+    
+    # Update layout
+    fig.update_layout(
+        title=f"{forecast_horizon}-Day Forecast by Region",
+        legend_title="Data Source"
+    )
+    
+    return fig
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def build_risk_chart(region_risk):
+    """Build the per-region risk bar chart (a choropleth would need proper geo data for the regions)."""
+    fig = px.bar(
+        region_risk.sort_values('risk_probability', ascending=False),
+        x='region',
+        y='risk_probability',
+        color='risk_probability',
+        color_continuous_scale=[(0, "green"), (0.4, "yellow"), (0.7, "red")],
+        range_color=[0, 1],
+        title="Outbreak Risk by Region"
+    )
+    
+    fig.update_layout(
+        xaxis_title="Region",
+        yaxis_title="Risk Probability",
+        height=500
+    )
+    
+    return fig
+
+def display_risk_alerts(high_risk_regions, forecast_horizon):
+    """Show one alert per high-risk region, rendered with a single markdown call."""
+    alert_classes = np.where(high_risk_regions['risk_probability'] >= 0.7, "alert-high", "alert-medium")
+    
+    alerts_html = "\n".join(
+        f'<div class="{alert_class}">⚠️ ALERT: {region} has a {risk_prob:.1%} probability '
+        f'of outbreak in the next {forecast_horizon} days!</div>'
+        for alert_class, region, risk_prob in zip(
+            alert_classes,
+            high_risk_regions['region'].to_numpy(),
+            high_risk_regions['risk_probability'].to_numpy()
+        )
+    )
+    
+    st.markdown(alerts_html, unsafe_allow_html=True)
+
+@st.fragment
+def display_risk_alerts_section(risk_data, forecast_horizon):
+    """Alert threshold slider and alerts, run as a fragment so moving the slider only reruns this section."""
+    st.subheader("Risk Alerts")
+    
+    # Configure alert threshold
+    alert_threshold = st.slider("Alert Threshold", 0.0, 1.0, 0.7, 0.1,
+                                help="Minimum risk probability to trigger an alert")
+    
+    # Filter for high-risk regions
+    high_risk = risk_data[risk_data['risk_probability'] >= alert_threshold]
+    
+    if high_risk.empty:
+        st.success("No regions currently exceed the alert threshold.")
+    else:
+        # Group by region and take the maximum risk
+        high_risk_regions = high_risk.groupby('region', observed=True)['risk_probability'].max().reset_index()
+        
+        display_risk_alerts(high_risk_regions, forecast_horizon)
+
+def display_risk_table(risk_data):
+    """Show the detailed risk table; probabilities stay numeric so they sort correctly and are formatted client-side."""
+    display_risk = risk_data.sort_values(['region', 'risk_probability'], ascending=[True, False])
+    display_risk = display_risk.assign(risk_probability=display_risk['risk_probability'] * 100)
+    
+    st.dataframe(
+        display_risk[['region', 'model', 'max_forecast', 'historical_avg', 'outbreak_threshold', 'risk_probability', 'risk_level']],
+        column_config={'risk_probability': st.column_config.NumberColumn('risk_probability', format='%.1f%%')},
+        use_container_width=True
+    )
+
+@st.fragment
+def display_data_explorer(filtered_data, region_view, selected_regions):
+    """Data Explorer visualizations, run as a fragment so its widgets only rerun this section."""
+    viz_type = st.selectbox("Visualization Type", ["Time Series", "Correlation Heatmap", "Feature Distribution"])
+    
+    # Numeric feature columns, shared by every visualization
+    numeric_cols = filtered_data.select_dtypes(include=[np.number]).columns.tolist()
+    default_feature_index = numeric_cols.index('cases') if 'cases' in numeric_cols else 0
+    
+    if viz_type == "Time Series":
+        # Select feature to visualize
+        selected_feature = st.selectbox("Select Feature", numeric_cols, index=default_feature_index)
         
-        # Calculate threshold for outbreak
-        outbreak_threshold = historical_avg + threshold_factor * historical_std
+        # Plot time series
+        fig = px.line(
+            filtered_data,
+            x='date',
+            y=selected_feature,
+            color='region',
+            title=f"{selected_feature} Over Time by Region"
+        )
         
-        # Calculate risk for each model
-        for model in region_forecasts['model'].unique():
-            model_forecasts = region_forecasts[region_forecasts['model'] == model]
-            
-            # Calculate maximum forecast
-            max_forecast = model_forecasts['forecast'].max()
+        fig.update_layout(height=600)
+        st.plotly_chart(fig, use_container_width=True)
+        
+    elif viz_type == "Correlation Heatmap":
+        # Select region for correlation analysis
+        region = st.selectbox("Select Region for Correlation Analysis", selected_regions)
+        
+        # Filter data for selected region
+        region_data = region_view.get(region, filtered_data.iloc[:0])
+        
+        # Select features for correlation
+        selected_features = st.multiselect("Select Features for Correlation", numeric_cols, default=numeric_cols[:5])
+        
+        if selected_features:
+            # Calculate correlation
+            corr = region_data[selected_features].corr(numeric_only=True)
+            
+            # Plot heatmap
+            fig = px.imshow(
+                corr,
+                text_auto='.2f',
+                aspect='auto',
+                color_continuous_scale='RdBu_r',
+                range_color=[-1, 1],
+                title=f"Correlation Heatmap for {region}"
+            )
             
-            # Calculate risk probability (simplified)
-            if historical_std > 0:
-                z_score = (max_forecast - historical_avg) / historical_std
-                risk_prob = min(1.0, max(0.0, (z_score - 1) / 3))
-            else:
-                risk_prob = 0.5  # Default if no variation in historical data
+            fig.update_layout(height=600)
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.info("Please select at least one feature for correlation analysis.")
             
-            # Determine risk level
-            if risk_prob >= 0.7:
-                risk_level = "High"
-            elif risk_prob >= 0.4:
-                risk_level = "Medium"
-            else:
-                risk_level = "Low"
-            
-            risk_data.append({
-                'region': region,
-                'model': model,
-                'max_forecast': max_forecast,
-                'historical_avg': historical_avg,
-                'outbreak_threshold': outbreak_threshold,
-                'risk_probability': risk_prob,
-                'risk_level': risk_level
-            })
-    
-    if not risk_data:
-        return pd.DataFrame()
+    elif viz_type == "Feature Distribution":
+        # Select feature for distribution
+        selected_feature = st.selectbox("Select Feature for Distribution", numeric_cols, index=default_feature_index)
+        
+        # Plot distribution
+        fig = px.histogram(
+            filtered_data,
+            x=selected_feature,
+            color='region',
+            marginal='box',
+            title=f"Distribution of {selected_feature} by Region"
+        )
         
-    return pd.DataFrame(risk_data)
+        fig.update_layout(height=500)
+        st.plotly_chart(fig, use_container_width=True)
 
 # Main app
 def main():
@@ -328,10 +655,11 @@ def main():
         
         if reload_data:
             st.cache_data.clear()
+            st.cache_resource.clear()
             st.rerun()
     
     # Load data
-    data = load_data()
+    data, data_fingerprint = load_data()
     
     if data.empty:
         st.error("No data available. Please run the data pipeline first.")
@@ -339,17 +667,17 @@ def main():
     
     # Filter options
     with st.sidebar.expander("Filter Options", expanded=True):
-        # Select regions
-        all_regions = sorted(data['region'].unique())
+        # Select regions (read from the categorical's categories rather than scanning the column)
+        all_regions = sorted(data['region'].cat.categories)
         selected_regions = st.multiselect("Select Regions", all_regions, default=all_regions[:3])
         
         # Select forecast horizon
         forecast_horizon = st.selectbox("Forecast Horizon", [7, 14], index=1)
         
         # Select models
-        forecasts = load_forecasts(forecast_horizon)
+        forecasts, forecast_fingerprint = load_forecasts(forecast_horizon)
         if not forecasts.empty:
-            all_models = sorted(forecasts['model'].unique())
+            all_models = sorted(forecasts['model'].cat.categories)
             selected_models = st.multiselect("Select Models", all_models, default=all_models)
         else:
             selected_models = []
@@ -360,15 +688,18 @@ def main():
     
     # Filter data
     if selected_regions:
-        filtered_data = data[data['region'].isin(selected_regions)]
+        filtered_data = data[categorical_mask(data['region'], selected_regions)]
     else:
         filtered_data = data
     
+    # Group once so per-region views below are dictionary lookups instead of column scans
+    region_view = dict(iter(filtered_data.groupby('region', sort=False, observed=True)))
+    
     # Filter forecasts
     if not forecasts.empty and selected_models and selected_regions:
         filtered_forecasts = forecasts[
-            forecasts['region'].isin(selected_regions) & 
-            forecasts['model'].isin(selected_models)
+            categorical_mask(forecasts['region'], selected_regions) & 
+            categorical_mask(forecasts['model'], selected_models)
         ]
     else:
         filtered_forecasts = pd.DataFrame()
@@ -407,8 +738,8 @@ def main():
             st.info("Using sample forecast data for demonstration")
             
             # Create sample dates
-            base_date = datetime.now()
-            dates = [base_date + timedelta(days=i) for i in range(-30, 15)]
+            base_date = pd.Timestamp.now()
+            dates = pd.date_range(base_date - pd.Timedelta(days=30), periods=45, freq='D')
             
             # Create sample regions
             sample_regions = ["Region A", "Region B", "Region C"]
@@ -417,16 +748,24 @@ def main():
             # Create sample models
             sample_models = ["LSTM", "Prophet", "ARIMA"]
             
-            for region in sample_regions:
-                st.subheader(f"Forecasts for {region}")
-                
-                # Create figure
-                fig = go.Figure()
-                
-                # Generate sample data
-                np.random.seed(42)  # For reproducibility
-                actual_cases = np.maximum(0, 100 + np.cumsum(np.random.normal(0, 10, 30)))
-                forecast_cases = np.maximum(0, actual_cases[-1] + np.cumsum(np.random.normal(5, 15, 15)))
+            # Generate sample data once; the fixed seed makes it identical for every region
+            rng = np.random.default_rng(42)  # For reproducibility
+            actual_cases = np.maximum(0, 100 + np.cumsum(rng.normal(0, 10, 30)))
+            forecast_cases = np.maximum(0, actual_cases[-1] + np.cumsum(rng.normal(5, 15, 15)))
+            
+            # One row per model, with some variation between models
+            model_factors = 0.8 + 0.4 * np.arange(len(sample_models)) / len(sample_models)
+            model_forecasts = model_factors[:, None] * forecast_cases
+            upper_bounds = model_forecasts * 1.2
+            lower_bounds = model_forecasts * 0.8
+            
+            # Create one figure with a subplot row per region
+            fig = make_subplots(rows=len(sample_regions), cols=1, shared_xaxes=True, subplot_titles=sample_regions)
+            model_colors = px.colors.qualitative.Plotly
+            
+            for row, region in enumerate(sample_regions, start=1):
+                # Only list each trace in the legend once
+                first_row = row == 1
                 
                 # Add actual data
                 fig.add_trace(go.Scatter(
@@ -434,121 +773,70 @@ def main():
                     y=actual_cases,
                     mode='lines+markers',
                     name='Actual Cases',
-                    line=dict(color='black', width=2)
-                ))
+                    line=dict(color='black', width=2),
+                    legendgroup='Actual Cases',
+                    showlegend=first_row
+                ), row=row, col=1)
                 
                 # Add forecasts for each model
                 for i, model in enumerate(sample_models):
-                    # Add some variation between models
-                    model_forecast = forecast_cases * (0.8 + 0.4 * i/len(sample_models))
-                    
                     fig.add_trace(go.Scatter(
                         x=dates[30:],
-                        y=model_forecast,
+                        y=model_forecasts[i],
                         mode='lines+markers',
                         name=f'{model} Forecast',
-                        line=dict(dash='dash')
-                    ))
+                        line=dict(dash='dash', color=model_colors[i]),
+                        legendgroup=f'{model} Forecast',
+                        showlegend=first_row
+                    ), row=row, col=1)
                     
                     # Add prediction intervals
-                    upper_bound = model_forecast * 1.2
-                    lower_bound = model_forecast * 0.8
-                    
                     fig.add_trace(go.Scatter(
                         x=dates[30:],
-                        y=upper_bound,
+                        y=upper_bounds[i],
                         mode='lines',
                         line=dict(width=0),
+                        legendgroup=f'{model} Prediction Interval',
                         showlegend=False
-                    ))
+                    ), row=row, col=1)
                     fig.add_trace(go.Scatter(
                         x=dates[30:],
-                        y=lower_bound,
+                        y=lower_bounds[i],
                         mode='lines',
                         line=dict(width=0),
                         fill='tonexty',
                         fillcolor=f'rgba({50*i}, 176, {246-50*i}, 0.2)',
-                        name=f'{model} Prediction Interval'
-                    ))
-                
-                # Update layout
-                fig.update_layout(
-                    title=f"{region} - 14-Day Forecast",
-                    xaxis_title="Date",
-                    yaxis_title="Cases",
-                    legend_title="Data Source",
-                    height=500
-                )
-                
-                st.plotly_chart(fig, use_container_width=True)
+                        name=f'{model} Prediction Interval',
+                        legendgroup=f'{model} Prediction Interval',
+                        showlegend=first_row
+                    ), row=row, col=1)
+            
+            # Update layout
+            fig.update_layout(
+                title="14-Day Forecast by Region",
+                legend_title="Data Source",
+                height=500 * len(sample_regions)
+            )
+            fig.update_xaxes(title_text="Date", row=len(sample_regions), col=1)
+            fig.update_yaxes(title_text="Cases")
+            
+            st.plotly_chart(fig, use_container_width=True)
         else:
-            # Use real data (existing code)
+            # Group forecasts once; regions without forecasts are reported instead of plotted
+            forecast_view = dict(iter(filtered_forecasts.groupby('region', sort=False, observed=True)))
+            plot_regions = [region for region in selected_regions if region in forecast_view]
+            
             for region in selected_regions:
-                st.subheader(f"Forecasts for {region}")
-                
-                # Get actual data for this region
-                region_data = filtered_data[filtered_data['region'] == region].sort_values('date')
-                
-                # Get forecasts for this region
-                region_forecasts = filtered_forecasts[filtered_forecasts['region'] == region]
-                
-                if region_forecasts.empty:
+                if region not in forecast_view:
                     st.info(f"No forecasts available for {region}")
-                    continue
-                
-                # Create figure
-                fig = go.Figure()
-                
-                # Add actual data
-                fig.add_trace(go.Scatter(
-                    x=region_data['date'],
-                    y=region_data['cases_cases'],
-                    mode='lines+markers',
-                    name='Actual Cases',
-                    line=dict(color='black', width=2)
-                ))
-                
-                # Add forecasts for each model
-                for model in region_forecasts['model'].unique():
-                    model_data = region_forecasts[region_forecasts['model'] == model].sort_values('forecast_horizon')
-                    
-                    fig.add_trace(go.Scatter(
-                        x=model_data['date'],
-                        y=model_data['forecast'],
-                        mode='lines+markers',
-                        name=f'{model} Forecast',
-                        line=dict(dash='dash')
-                    ))
-                    
-                    # Add prediction intervals if available
-                    if 'forecast_lower' in model_data.columns and 'forecast_upper' in model_data.columns:
-                        fig.add_trace(go.Scatter(
-                            x=model_data['date'],
-                            y=model_data['forecast_upper'],
-                            mode='lines',
-                            line=dict(width=0),
-                            showlegend=False
-                        ))
-                        fig.add_trace(go.Scatter(
-                            x=model_data['date'],
-                            y=model_data['forecast_lower'],
-                            mode='lines',
-                            line=dict(width=0),
-                            fill='tonexty',
-                            fillcolor='rgba(0, 176, 246, 0.2)',
-                            name=f'{model} Prediction Interval'
-                        ))
-                
-                # Update layout
-                fig.update_layout(
-                    title=f"{region} - {forecast_horizon}-Day Forecast",
-                    xaxis_title="Date",
-                    yaxis_title="Cases",
-                    legend_title="Data Source",
-                    height=500
-                )
-                
-                st.plotly_chart(fig, use_container_width=True)
+            
+            fig = build_forecast_figure(
+                {region: region_view.get(region, filtered_data.iloc[:0]) for region in plot_regions},
+                filtered_forecasts, tuple(plot_regions), tuple(sorted(selected_models)), forecast_horizon,
+                data_fingerprint, forecast_fingerprint
+            )
+            
+            st.plotly_chart(fig, use_container_width=True)
     
     # Tab 3: Risk Assessment
     with tab3:
@@ -559,30 +847,26 @@ def main():
             
             # Create sample risk data
             sample_regions = ["Region A", "Region B", "Region C", "Region D", "Region E"]
-            np.random.seed(42)  # For reproducibility
-            
-            # Create sample risk dataframe
-            risk_data = []
-            for region in sample_regions:
-                risk_prob = np.random.uniform(0, 1)
-                risk_level = "High" if risk_prob >= 0.7 else "Medium" if risk_prob >= 0.4 else "Low"
-                risk_data.append({
-                    'region': region,
-                    'model': 'Ensemble',
-                    'max_forecast': np.random.randint(50, 200),
-                    'historical_avg': np.random.randint(30, 100),
-                    'outbreak_threshold': np.random.randint(80, 150),
-                    'risk_probability': risk_prob,
-                    'risk_level': risk_level
-                })
-            
-            sample_risk_df = pd.DataFrame(risk_data)
+            n_regions = len(sample_regions)
+            rng = np.random.default_rng(42)  # For reproducibility
+            
+            # Create sample risk dataframe from whole columns
+            risk_probs = rng.uniform(0, 1, size=n_regions)
+            sample_risk_df = pd.DataFrame({
+                'region': sample_regions,
+                'model': 'Ensemble',
+                'max_forecast': rng.integers(50, 200, size=n_regions),
+                'historical_avg': rng.integers(30, 100, size=n_regions),
+                'outbreak_threshold': rng.integers(80, 150, size=n_regions),
+                'risk_probability': risk_probs,
+                'risk_level': np.select([risk_probs >= 0.7, risk_probs >= 0.4], ["High", "Medium"], default="Low")
+            })
             
             # Display risk heatmap
             st.subheader("Risk Heatmap by Region")
             
             # Aggregate risk by region
-            region_risk = sample_risk_df.groupby('region')['risk_probability'].max().reset_index()
+            region_risk = sample_risk_df.groupby('region', observed=True)['risk_probability'].max().reset_index()
             
             # Create bar chart
             fig = px.bar(
@@ -604,67 +888,33 @@ def main():
             st.plotly_chart(fig, use_container_width=True)
             
             # Display risk alerts
-            st.subheader("Risk Alerts")
-            
-            # Configure alert threshold
-            alert_threshold = st.slider("Alert Threshold", 0.0, 1.0, 0.7, 0.1,
-                                      help="Minimum risk probability to trigger an alert")
-            
-            # Filter for high-risk regions
-            high_risk = sample_risk_df[sample_risk_df['risk_probability'] >= alert_threshold]
-            
-            if high_risk.empty:
-                st.success("No regions currently exceed the alert threshold.")
-            else:
-                # Group by region and take the maximum risk
-                high_risk_regions = high_risk.groupby('region')['risk_probability'].max().reset_index()
-                
-                for _, row in high_risk_regions.iterrows():
-                    region = row['region']
-                    risk_prob = row['risk_probability']
-                    
-                    alert_class = "alert-high" if risk_prob >= 0.7 else "alert-medium"
-                    
-                    st.markdown(f"""
-                    <div class="{alert_class}">
-                        ⚠️ ALERT: {region} has a {risk_prob:.1%} probability of outbreak in the next {forecast_horizon} days!
-                    </div>
-                    """, unsafe_allow_html=True)
+            display_risk_alerts_section(sample_risk_df, forecast_horizon)
             
             # Detailed risk table
             st.subheader("Detailed Risk Assessment")
             
-            # Format the risk data for display
-            display_risk = sample_risk_df.copy()
-            display_risk['risk_probability'] = display_risk['risk_probability'].apply(lambda x: f"{x:.1%}")
-            display_risk = display_risk.sort_values(['region', 'risk_probability'], ascending=[True, False])
-            
-            st.dataframe(
-                display_risk[['region', 'model', 'max_forecast', 'historical_avg', 'outbreak_threshold', 'risk_probability', 'risk_level']],
-                use_container_width=True
-            )
+            # Display the risk data, formatting probabilities as percentages in the browser
+            display_risk_table(sample_risk_df)
             
             # Add a risk trend visualization
             st.subheader("Risk Trend Analysis")
             
             # Create sample dates for trend
-            base_date = datetime.now()
-            trend_dates = [base_date - timedelta(days=i) for i in range(14, 0, -1)]
-            
-            # Create sample risk trends
-            trend_data = []
-            for region in sample_regions[:3]:  # Show trends for top 3 regions
-                base_risk = np.random.uniform(0.3, 0.8)
-                for date in trend_dates:
-                    # Add some random variation to the risk
-                    daily_risk = max(0, min(1, base_risk + np.random.normal(0, 0.05)))
-                    trend_data.append({
-                        'region': region,
-                        'date': date,
-                        'risk': daily_risk
-                    })
-            
-            trend_df = pd.DataFrame(trend_data)
+            base_date = pd.Timestamp.now()
+            trend_dates = pd.date_range(end=base_date - pd.Timedelta(days=1), periods=14, freq='D')
+            
+            # Create sample risk trends for the top 3 regions in a single draw
+            trend_regions = sample_regions[:3]
+            base_risks = rng.uniform(0.3, 0.8, size=len(trend_regions))[:, None]
+            
+            # Add some random variation to the risk
+            daily_risks = np.clip(base_risks + rng.normal(0, 0.05, size=(len(trend_regions), len(trend_dates))), 0, 1)
+            
+            trend_df = pd.DataFrame({
+                'region': np.repeat(trend_regions, len(trend_dates)),
+                'date': np.tile(trend_dates, len(trend_regions)),
+                'risk': daily_risks.ravel()
+            })
             
             # Create line chart of risk trends
             fig = px.line(
@@ -688,7 +938,12 @@ def main():
             st.plotly_chart(fig, use_container_width=True)
         else:
             # Calculate risk
-            risk_data = calculate_outbreak_risk(filtered_forecasts, filtered_data, risk_threshold)
+            historical_stats = calculate_historical_stats(data, data_fingerprint)
+            risk_data = calculate_selection_risk(
+                filtered_forecasts, historical_stats,
+                tuple(sorted(selected_regions)), tuple(sorted(selected_models)), risk_threshold,
+                data_fingerprint, forecast_fingerprint
+            )
             
             if risk_data.empty:
                 st.warning("Could not calculate risk with the available data.")
@@ -697,80 +952,18 @@ def main():
                 st.subheader("Risk Heatmap by Region")
                 
                 # Aggregate risk by region (take maximum across models)
-                region_risk = risk_data.groupby('region')['risk_probability'].max().reset_index()
+                region_risk = risk_data.groupby('region', observed=True)['risk_probability'].max().reset_index()
                 
-                # Create heatmap
-                fig = px.choropleth(
-                    region_risk,
-                    locations='region',
-                    locationmode='country names',  # This is a simplification; real app would need proper geo data
-                    color='risk_probability',
-                    hover_name='region',
-                    color_continuous_scale=[(0, "green"), (0.4, "yellow"), (0.7, "red")],
-                    range_color=[0, 1],
-                    title="Outbreak Risk by Region"
-                )
-                
-                # Fallback to bar chart if choropleth doesn't work (no geo data)
-                if len(region_risk) > 0:
-                    fig = px.bar(
-                        region_risk.sort_values('risk_probability', ascending=False),
-                        x='region',
-                        y='risk_probability',
-                        color='risk_probability',
-                        color_continuous_scale=[(0, "green"), (0.4, "yellow"), (0.7, "red")],
-                        range_color=[0, 1],
-                        title="Outbreak Risk by Region"
-                    )
-                    
-                    fig.update_layout(
-                        xaxis_title="Region",
-                        yaxis_title="Risk Probability",
-                        height=500
-                    )
-                    
-                    st.plotly_chart(fig, use_container_width=True)
+                st.plotly_chart(build_risk_chart(region_risk), use_container_width=True)
                 
                 # Display risk alerts
-                st.subheader("Risk Alerts")
-                
-                # Configure alert threshold
-                alert_threshold = st.slider("Alert Threshold", 0.0, 1.0, 0.7, 0.1,
-                                          help="Minimum risk probability to trigger an alert")
-                
-                # Filter for high-risk regions
-                high_risk = risk_data[risk_data['risk_probability'] >= alert_threshold]
-                
-                if high_risk.empty:
-                    st.success("No regions currently exceed the alert threshold.")
-                else:
-                    # Group by region and take the maximum risk
-                    high_risk_regions = high_risk.groupby('region')['risk_probability'].max().reset_index()
-                    
-                    for _, row in high_risk_regions.iterrows():
-                        region = row['region']
-                        risk_prob = row['risk_probability']
-                        
-                        alert_class = "alert-high" if risk_prob >= 0.7 else "alert-medium"
-                        
-                        st.markdown(f"""
-                        <div class="{alert_class}">
-                            ⚠️ ALERT: {region} has a {risk_prob:.1%} probability of outbreak in the next {forecast_horizon} days!
-                        </div>
-                        """, unsafe_allow_html=True)
+                display_risk_alerts_section(risk_data, forecast_horizon)
                 
                 # Detailed risk table
                 st.subheader("Detailed Risk Assessment")
                 
-                # Format the risk data for display
-                display_risk = risk_data.copy()
-                display_risk['risk_probability'] = display_risk['risk_probability'].apply(lambda x: f"{x:.1%}")
-                display_risk = display_risk.sort_values(['region', 'risk_probability'], ascending=[True, False])
-                
-                st.dataframe(
-                    display_risk[['region', 'model', 'max_forecast', 'historical_avg', 'outbreak_threshold', 'risk_probability', 'risk_level']],
-                    use_container_width=True
-                )
+                # Display the risk data, formatting probabilities as percentages in the browser
+                display_risk_table(risk_data)
     
     # Tab 3: Data Explorer
     with tab3:
@@ -782,77 +975,33 @@ def main():
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            st.metric("Total Regions", len(filtered_data['region'].unique()))
+            # Every region present in the filtered data has an entry in the pre-grouped view
+            st.metric("Total Regions", len(region_view))
         
         with col2:
-            st.metric("Date Range", f"{filtered_data['date'].min().date()} to {filtered_data['date'].max().date()}")
+            # A min/max over the already-filtered frame is cheaper than keying a cache on the selection
+            date_min, date_max = filtered_data['date'].agg(['min', 'max'])
+            st.metric("Date Range", f"{date_min.date()} to {date_max.date()}")
         
         with col3:
             st.metric("Total Records", len(filtered_data))
         
-        # Data visualization options
-        viz_type = st.selectbox("Visualization Type", ["Time Series", "Correlation Heatmap", "Feature Distribution"])
-        
-        if viz_type == "Time Series":
-            # Select feature to visualize
-            numeric_cols = filtered_data.select_dtypes(include=[np.number]).columns.tolist()
-            selected_feature = st.selectbox("Select Feature", numeric_cols, index=numeric_cols.index('cases') if 'cases' in numeric_cols else 0)
-            
-            # Plot time series
-            fig = px.line(
-                filtered_data,
-                x='date',
-                y=selected_feature,
-                color='region',
-                title=f"{selected_feature} Over Time by Region"
-            )
-            
-            fig.update_layout(height=600)
-            st.plotly_chart(fig, use_container_width=True)
-            
-        elif viz_type == "Correlation Heatmap":
-            # Select region for correlation analysis
-            region = st.selectbox("Select Region for Correlation Analysis", selected_regions)
-            
-            # Filter data for selected region
-            region_data = filtered_data[filtered_data['region'] == region]
-            
-            # Select features for correlation
-            numeric_cols = region_data.select_dtypes(include=[np.number]).columns.tolist()
-            selected_features = st.multiselect("Select Features for Correlation", numeric_cols, default=numeric_cols[:5])
-            
-            if selected_features:
-                # Calculate correlation
-                corr = region_data[selected_features].corr()
-                
-                # Plot heatmap
-                fig, ax = plt.subplots(figsize=(10, 8))
-                sns.heatmap(corr, annot=True, cmap='coolwarm', ax=ax)
-                plt.title(f"Correlation Heatmap for {region}")
-                st.pyplot(fig)
-            else:
-                st.info("Please select at least one feature for correlation analysis.")
-                
-        elif viz_type == "Feature Distribution":
-            # Select feature for distribution
-            numeric_cols = filtered_data.select_dtypes(include=[np.number]).columns.tolist()
-            selected_feature = st.selectbox("Select Feature for Distribution", numeric_cols, index=numeric_cols.index('cases') if 'cases' in numeric_cols else 0)
-            
-            # Plot distribution
-            fig = px.histogram(
-                filtered_data,
-                x=selected_feature,
-                color='region',
-                marginal='box',
-                title=f"Distribution of {selected_feature} by Region"
-            )
-            
-            fig.update_layout(height=500)
-            st.plotly_chart(fig, use_container_width=True)
+        # Data visualization options (reruns on its own when its widgets change)
+        display_data_explorer(filtered_data, region_view, selected_regions)
         
         # Raw data viewer
         with st.expander("View Raw Data"):
-            st.dataframe(filtered_data, use_container_width=True)
+            # Send at most RAW_DATA_MAX_ROWS rows to the browser; larger selections are paged with a slider
+            total_rows = len(filtered_data)
+            
+            if total_rows > RAW_DATA_MAX_ROWS:
+                page = st.slider("Page", 1, math.ceil(total_rows / RAW_DATA_MAX_ROWS), 1)
+                start_row = (page - 1) * RAW_DATA_MAX_ROWS
+                end_row = min(start_row + RAW_DATA_MAX_ROWS, total_rows)
+                st.caption(f"Showing rows {start_row:,} to {end_row:,} of {total_rows:,}")
+                st.dataframe(filtered_data.iloc[start_row:end_row], use_container_width=True)
+            else:
+                st.dataframe(filtered_data, use_container_width=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
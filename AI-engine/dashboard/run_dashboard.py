@@ -2,9 +2,21 @@ import os
 import sys
 import subprocess
 
-def run_dashboard():
+# Streamlit settings applied unless already set in the environment: no file watcher or
+# rerun-on-save (the dashboard is not being edited while served) and no usage-stats request
+STREAMLIT_ENV_DEFAULTS = {
+    'STREAMLIT_SERVER_FILE_WATCHER_TYPE': 'none',
+    'STREAMLIT_SERVER_RUN_ON_SAVE': 'false',
+    'STREAMLIT_GLOBAL_DEVELOPMENT_MODE': 'false',
+    'STREAMLIT_BROWSER_GATHER_USAGE_STATS': 'false'
+}
+
+def run_dashboard(headless=False):
     """
     Run the Streamlit dashboard application.
+    
+    Args:
+        headless: Run without opening a browser (e.g. inside a container)
     """
     # Get the directory of this script
     current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -20,7 +32,15 @@ def run_dashboard():
     # Run the Streamlit app
     try:
         print("Starting Outbreak Prediction Dashboard...")
-        subprocess.run(["streamlit", "run", app_path], check=True)
+        env = os.environ.copy()
+        for key, value in STREAMLIT_ENV_DEFAULTS.items():
+            env.setdefault(key, value)
+        
+        command = ["streamlit", "run", app_path]
+        if headless:
+            command.append("--server.headless=true")
+        
+        subprocess.run(command, env=env, check=True)
         return True
     except subprocess.CalledProcessError as e:
         print(f"Error running Streamlit dashboard: {e}")
@@ -30,4 +50,4 @@ def run_dashboard():
         return False
 
 if __name__ == "__main__":
-    run_dashboard()
\ No newline at end of file
+    run_dashboard(headless="--headless" in sys.argv[1:])
\ No newline at end of file
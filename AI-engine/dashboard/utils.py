@@ -1,15 +1,39 @@
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime, timedelta
 import os
 import sys
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+def index_by_region(df):
+    """
+    Index a DataFrame by region once, so later per-region lookups use the index instead of scanning the column.
+    
+    Args:
+        df (pd.DataFrame): DataFrame with a region column
+        
+    Returns:
+        pd.DataFrame: DataFrame indexed and sorted by region
+    """
+    return df.set_index('region').sort_index()
+
+def _select_region(df, region):
+    """
+    Select the rows for one region, by index lookup if the frame is indexed by region.
+    
+    Args:
+        df (pd.DataFrame): DataFrame with a region column or a region index
+        region (str): Region to select
+        
+    Returns:
+        pd.DataFrame: Rows for the region
+    """
+    if df.index.name == 'region':
+        return df.loc[[region]] if region in df.index else df.iloc[:0]
+    
+    return df[df['region'] == region]
+
 def create_forecast_plot(actual_data, forecast_data, region, forecast_horizon):
     """
     Create a plotly figure showing actual vs predicted cases for a specific region.
@@ -24,12 +48,15 @@ def create_forecast_plot(actual_data, forecast_data, region, forecast_horizon):
         plotly.graph_objects.Figure: Plotly figure object
     """
     # Filter data for the specified region
-    region_actual = actual_data[actual_data['region'] == region].sort_values('date')
-    region_forecasts = forecast_data[forecast_data['region'] == region]
+    region_actual = _select_region(actual_data, region).sort_values('date')
+    region_forecasts = _select_region(forecast_data, region)
     
     if region_forecasts.empty:
         return None
     
+    # Imported here so the non-plotting helpers do not pay for loading Plotly
+    import plotly.graph_objects as go
+    
     # Create figure
     fig = go.Figure()
     
@@ -43,8 +70,8 @@ def create_forecast_plot(actual_data, forecast_data, region, forecast_horizon):
     ))
     
     # Add forecasts for each model
-    for model in region_forecasts['model'].unique():
-        model_data = region_forecasts[region_forecasts['model'] == model].sort_values('forecast_horizon')
+    for model, model_data in region_forecasts.groupby('model', sort=False, observed=True):
+        model_data = model_data.sort_values('forecast_horizon')
         
         fig.add_trace(go.Scatter(
             x=model_data['date'],
@@ -95,7 +122,9 @@ def create_risk_heatmap(risk_data):
         plotly.graph_objects.Figure: Plotly figure object
     """
     # Aggregate risk by region (take maximum across models)
-    region_risk = risk_data.groupby('region')['risk_probability'].max().reset_index()
+    region_risk = risk_data.groupby('region', observed=True)['risk_probability'].max().reset_index()
+    
+    import plotly.express as px
     
     # Create bar chart (fallback from choropleth which would need geo data)
     fig = px.bar(
@@ -131,58 +160,42 @@ def calculate_outbreak_risk(forecasts, actual, threshold_factor=1.5):
     if forecasts.empty:
         return pd.DataFrame()
     
-    risk_data = []
+    # Calculate historical average and standard deviation for all regions in one pass
+    historical = actual.groupby('region', sort=False, observed=True)['cases_cases'].agg(
+        historical_avg='mean', historical_std='std'
+    )
     
-    for region in forecasts['region'].unique():
-        region_forecasts = forecasts[forecasts['region'] == region]
-        region_actual = actual[actual['region'] == region]
-        
-        if region_actual.empty:
-            continue
-        
-        # Calculate historical average and standard deviation
-        historical_avg = region_actual['cases_cases'].mean()
-        historical_std = region_actual['cases_cases'].std()
-        
-        # Calculate threshold for outbreak
-        outbreak_threshold = historical_avg + threshold_factor * historical_std
-        
-        # Calculate risk for each model
-        for model in region_forecasts['model'].unique():
-            model_forecasts = region_forecasts[region_forecasts['model'] == model]
-            
-            # Calculate maximum forecast
-            max_forecast = model_forecasts['forecast'].max()
-            
-            # Calculate risk probability (simplified)
-            if historical_std > 0:
-                z_score = (max_forecast - historical_avg) / historical_std
-                risk_prob = min(1.0, max(0.0, (z_score - 1) / 3))
-            else:
-                risk_prob = 0.5  # Default if no variation in historical data
-            
-            # Determine risk level
-            if risk_prob >= 0.7:
-                risk_level = "High"
-            elif risk_prob >= 0.4:
-                risk_level = "Medium"
-            else:
-                risk_level = "Low"
-            
-            risk_data.append({
-                'region': region,
-                'model': model,
-                'max_forecast': max_forecast,
-                'historical_avg': historical_avg,
-                'outbreak_threshold': outbreak_threshold,
-                'risk_probability': risk_prob,
-                'risk_level': risk_level
-            })
-    
-    if not risk_data:
+    # Calculate maximum forecast for every region/model pair
+    max_forecasts = (
+        forecasts.groupby(['region', 'model'], sort=False, observed=True)['forecast']
+        .max()
+        .rename('max_forecast')
+        .reset_index()
+    )
+    
+    # Regions without historical data are dropped by the inner join
+    risk_data = max_forecasts.merge(historical, left_on='region', right_index=True, how='inner')
+    
+    if risk_data.empty:
         return pd.DataFrame()
-        
-    return pd.DataFrame(risk_data)
+    
+    # Calculate threshold for outbreak
+    risk_data['outbreak_threshold'] = risk_data['historical_avg'] + threshold_factor * risk_data['historical_std']
+    
+    # Calculate risk probability (simplified); default to 0.5 if no variation in historical data
+    z_score = (risk_data['max_forecast'] - risk_data['historical_avg']) / risk_data['historical_std']
+    risk_data['risk_probability'] = np.clip((z_score - 1) / 3, 0.0, 1.0).where(risk_data['historical_std'] > 0, 0.5)
+    
+    # Determine risk level
+    risk_data['risk_level'] = pd.cut(
+        risk_data['risk_probability'],
+        bins=[-np.inf, 0.4, 0.7, np.inf],
+        labels=['Low', 'Medium', 'High'],
+        right=False
+    ).astype(str)
+    
+    return risk_data[['region', 'model', 'max_forecast', 'historical_avg',
+                      'outbreak_threshold', 'risk_probability', 'risk_level']].reset_index(drop=True)
 
 def generate_alert_html(region, risk_prob, forecast_horizon):
     """
@@ -214,9 +227,10 @@ def format_risk_data_for_display(risk_data):
     Returns:
         pd.DataFrame: Formatted DataFrame for display
     """
-    display_risk = risk_data.copy()
-    display_risk['risk_probability'] = display_risk['risk_probability'].apply(lambda x: f"{x:.1%}")
-    display_risk = display_risk.sort_values(['region', 'risk_probability'], ascending=[True, False])
+    # Sort on the numeric probabilities, then format the whole column at once instead of per row
+    display_risk = risk_data.sort_values(['region', 'risk_probability'], ascending=[True, False])
+    display_risk = display_risk[['region', 'model', 'max_forecast', 'historical_avg', 
+                                 'outbreak_threshold', 'risk_probability', 'risk_level']].copy()
+    display_risk['risk_probability'] = (display_risk['risk_probability'] * 100).round(1).astype(str) + '%'
     
-    return display_risk[['region', 'model', 'max_forecast', 'historical_avg', 
-                         'outbreak_threshold', 'risk_probability', 'risk_level']]
\ No newline at end of file
+    return display_risk
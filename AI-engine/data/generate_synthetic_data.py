@@ -1,9 +1,8 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
 import os
 
-def generate_case_data(start_date='2020-01-01', days=730, regions=5):
+def generate_case_data(start_date='2020-01-01', days=730, regions=5, rng=None):
     """
     Generate synthetic case count data.
     
@@ -11,77 +10,62 @@ def generate_case_data(start_date='2020-01-01', days=730, regions=5):
         start_date: Start date for the time series
         days: Number of days to generate
         regions: Number of regions to generate data for
+        rng: NumPy random Generator to draw from (a fresh default_rng() if None)
         
     Returns:
         DataFrame with synthetic case data
     """
-    # Create date range
-    dates = [datetime.strptime(start_date, '%Y-%m-%d') + timedelta(days=i) for i in range(days)]
-    
-    # Create empty DataFrame
-    data = []
+    if rng is None:
+        rng = np.random.default_rng()
     
-    # Generate data for each region
-    for region_id in range(1, regions + 1):
-        region_name = f"Region_{region_id}"
-        
-        # Base case count (different for each region)
-        base_cases = np.random.randint(10, 50)
-        
-        # Seasonal component (yearly cycle)
-        seasonal_amplitude = np.random.randint(20, 100)
-        
-        # Trend component
-        trend_slope = np.random.uniform(0.05, 0.2)
-        
-        # Outbreak simulation parameters
-        outbreak_starts = np.random.choice(range(days - 30), size=3, replace=False)
-        outbreak_durations = np.random.randint(14, 30, size=3)
-        outbreak_magnitudes = np.random.randint(50, 200, size=3)
-        
-        for i, date in enumerate(dates):
-            # Base component
-            cases = base_cases
-            
-            # Add seasonal component
-            day_of_year = date.timetuple().tm_yday
-            seasonal_component = seasonal_amplitude * np.sin(2 * np.pi * day_of_year / 365)
-            cases += seasonal_component
-            
-            # Add trend component
-            cases += trend_slope * i
-            
-            # Add outbreak effects
-            for start, duration, magnitude in zip(outbreak_starts, outbreak_durations, outbreak_magnitudes):
-                if start <= i < start + duration:
-                    # Outbreak curve (rises quickly, falls slowly)
-                    position_in_outbreak = i - start
-                    if position_in_outbreak < duration / 3:
-                        # Rising phase
-                        outbreak_effect = magnitude * (position_in_outbreak / (duration / 3))
-                    else:
-                        # Falling phase
-                        outbreak_effect = magnitude * (1 - (position_in_outbreak - duration / 3) / (2 * duration / 3))
-                    cases += outbreak_effect
-            
-            # Add random noise
-            noise = np.random.normal(0, max(5, cases * 0.1))
-            cases = max(0, cases + noise)
-            
-            # Round to integer
-            cases = round(cases)
-            
-            data.append({
-                'date': date,
-                'region': region_name,
-                'cases': cases
-            })
-    
-    # Convert to DataFrame
-    df = pd.DataFrame(data)
+    # Create date range
+    dates = pd.date_range(start=start_date, periods=days, freq='D')
+    
+    # Day index and seasonal (yearly cycle) basis for every date, shared by all regions
+    day_index = np.arange(days)
+    seasonal_basis = np.sin(2 * np.pi * dates.dayofyear.to_numpy() / 365)
+    
+    # Per-region parameters, one entry (or row of three outbreaks) per region
+    base_cases = rng.integers(10, 50, size=regions)
+    seasonal_amplitude = rng.integers(20, 100, size=regions)
+    trend_slope = rng.uniform(0.05, 0.2, size=regions)
+    outbreak_starts = np.array([rng.choice(days - 30, size=3, replace=False) for _ in range(regions)])
+    outbreak_durations = rng.integers(14, 30, size=(regions, 3))
+    outbreak_magnitudes = rng.integers(50, 200, size=(regions, 3))
+    
+    # Base, seasonal and trend components as a (regions, days) matrix
+    cases = (base_cases[:, None] + np.outer(seasonal_amplitude, seasonal_basis)
+             + np.outer(trend_slope, day_index))
+    
+    # Add outbreak effects, one outbreak at a time across all regions
+    for start, duration, magnitude in zip(outbreak_starts.T, outbreak_durations.T, outbreak_magnitudes.T):
+        # Outbreak curve (rises quickly, falls slowly)
+        position_in_outbreak = day_index - start[:, None]
+        duration = duration[:, None]
+        magnitude = magnitude[:, None]
+        rising_effect = magnitude * (position_in_outbreak / (duration / 3))
+        falling_effect = magnitude * (1 - (position_in_outbreak - duration / 3) / (2 * duration / 3))
+        outbreak_effect = np.where(position_in_outbreak < duration / 3, rising_effect, falling_effect)
+        cases += np.where((position_in_outbreak >= 0) & (position_in_outbreak < duration), outbreak_effect, 0)
+    
+    # Add random noise
+    noise = rng.normal(0, np.maximum(5, cases * 0.1))
+    cases = np.maximum(0, cases + noise)
+    
+    # Flatten region by region into the column arrays
+    region_names = [f"Region_{region_id}" for region_id in range(1, regions + 1)]
+    region_codes = np.repeat(np.arange(regions, dtype=np.min_scalar_type(regions)), days)
+    cases_out = np.round(cases).ravel().astype(np.int32)
+    
+    # Build the DataFrame from the column arrays
+    df = pd.DataFrame({
+        'date': np.tile(dates.to_numpy(), regions),
+        'region': pd.Categorical.from_codes(region_codes, categories=region_names),
+        'cases': cases_out
+    })
     return df
 
-def generate_weather_data(start_date='2020-01-01', days=730, regions=5):
+def generate_weather_data(start_date='2020-01-01', days=730, regions=5, rng=None):
     """
     Generate synthetic weather data.
     
@@ -89,68 +73,69 @@ def generate_weather_data(start_date='2020-01-01', days=730, regions=5):
         start_date: Start date for the time series
         days: Number of days to generate
         regions: Number of regions to generate data for
+        rng: NumPy random Generator to draw from (a fresh default_rng() if None)
         
     Returns:
         DataFrame with synthetic weather data
     """
-    # Create date range
-    dates = [datetime.strptime(start_date, '%Y-%m-%d') + timedelta(days=i) for i in range(days)]
-    
-    # Create empty DataFrame
-    data = []
+    if rng is None:
+        rng = np.random.default_rng()
     
-    # Generate data for each region
-    for region_id in range(1, regions + 1):
-        region_name = f"Region_{region_id}"
-        
-        # Base values (different for each region)
-        base_temp = np.random.uniform(5, 15)
-        base_humidity = np.random.uniform(40, 70)
-        
-        # Seasonal amplitudes
-        temp_amplitude = np.random.uniform(10, 20)
-        humidity_amplitude = np.random.uniform(10, 30)
-        
-        for i, date in enumerate(dates):
-            # Day of year for seasonal patterns
-            day_of_year = date.timetuple().tm_yday
-            
-            # Temperature with seasonal pattern
-            temperature = base_temp + temp_amplitude * np.sin(2 * np.pi * (day_of_year - 30) / 365)
-            temperature += np.random.normal(0, 2)  # Add noise
-            
-            # Humidity with seasonal pattern (inverse to temperature)
-            humidity = base_humidity - humidity_amplitude * np.sin(2 * np.pi * (day_of_year - 30) / 365)
-            humidity += np.random.normal(0, 5)  # Add noise
-            humidity = max(0, min(100, humidity))  # Clip to valid range
-            
-            # Precipitation (more in winter, less in summer)
-            precip_base = 5 - 4 * np.sin(2 * np.pi * (day_of_year - 30) / 365)
-            precipitation = max(0, np.random.exponential(precip_base))
-            
-            data.append({
-                'date': date,
-                'region': region_name,
-                'temperature': round(temperature, 1),
-                'humidity': round(humidity, 1),
-                'precipitation': round(precipitation, 1)
-            })
-    
-    # Convert to DataFrame
-    df = pd.DataFrame(data)
+    # Create date range
+    dates = pd.date_range(start=start_date, periods=days, freq='D')
+    
+    # Seasonal basis for every date, computed once and shared by all regions
+    day_of_year = dates.dayofyear.to_numpy()
+    seasonal_basis = np.sin(2 * np.pi * (day_of_year - 30) / 365)
+    
+    # Precipitation scale (more in winter, less in summer)
+    precip_base = 5 - 4 * seasonal_basis
+    
+    # Base values and seasonal amplitudes (different for each region)
+    base_temp = rng.uniform(5, 15, size=regions)
+    base_humidity = rng.uniform(40, 70, size=regions)
+    temp_amplitude = rng.uniform(10, 20, size=regions)
+    humidity_amplitude = rng.uniform(10, 30, size=regions)
+    
+    # Temperature with seasonal pattern plus noise, as a (regions, days) matrix
+    temperature = base_temp[:, None] + np.outer(temp_amplitude, seasonal_basis) + rng.normal(0, 2, size=(regions, days))
+    
+    # Humidity with seasonal pattern (inverse to temperature), clipped to valid range
+    humidity = base_humidity[:, None] - np.outer(humidity_amplitude, seasonal_basis) + rng.normal(0, 5, size=(regions, days))
+    humidity = np.clip(humidity, 0, 100)
+    
+    # Precipitation
+    precipitation = rng.exponential(np.broadcast_to(precip_base, (regions, days)))
+    
+    # Region labels for the flattened (region by region) rows
+    region_names = [f"Region_{region_id}" for region_id in range(1, regions + 1)]
+    region_codes = np.repeat(np.arange(regions, dtype=np.min_scalar_type(regions)), days)
+    
+    # Build the DataFrame from the column arrays
+    df = pd.DataFrame({
+        'date': np.tile(dates.to_numpy(), regions),
+        'region': pd.Categorical.from_codes(region_codes, categories=region_names),
+        'temperature': np.round(temperature.ravel(), 1),
+        'humidity': np.round(humidity.ravel(), 1),
+        'precipitation': np.round(precipitation.ravel(), 1)
+    })
     return df
 
-def generate_wastewater_data(case_data, lag_days=7):
+def generate_wastewater_data(case_data, lag_days=7, rng=None):
     """
     Generate synthetic wastewater viral load data based on case data.
     
     Args:
         case_data: DataFrame with case data
         lag_days: Number of days wastewater signal precedes cases
+        rng: NumPy random Generator to draw from (a fresh default_rng() if None)
         
     Returns:
         DataFrame with synthetic wastewater data
     """
+    if rng is None:
+        rng = np.random.default_rng()
+    
     # Create a copy of case data and shift dates back
     wastewater_data = case_data.copy()
     
@@ -159,9 +144,9 @@ def generate_wastewater_data(case_data, lag_days=7):
     
     # Transform case counts to viral load
     # Viral load is proportional to cases but with different scaling and more noise
-    wastewater_data['viral_load'] = wastewater_data['cases'] * np.random.uniform(0.8, 1.2, size=len(wastewater_data))
-    wastewater_data['viral_load'] *= np.random.uniform(5, 15)  # Scale factor
-    wastewater_data['viral_load'] += np.random.normal(0, wastewater_data['viral_load'] * 0.2)  # Add noise
+    wastewater_data['viral_load'] = wastewater_data['cases'] * rng.uniform(0.8, 1.2, size=len(wastewater_data))
+    wastewater_data['viral_load'] *= rng.uniform(5, 15)  # Scale factor
+    wastewater_data['viral_load'] += rng.normal(0, wastewater_data['viral_load'] * 0.2)  # Add noise
     wastewater_data['viral_load'] = wastewater_data['viral_load'].round(2)
     
     # Drop the cases column
@@ -172,34 +157,52 @@ def generate_wastewater_data(case_data, lag_days=7):
     
     return wastewater_data
 
-def save_synthetic_data(output_dir='../data'):
+def save_synthetic_data(output_dir='../data', seed=None, csv=False):
     """
     Generate and save all synthetic datasets.
     
     Args:
         output_dir: Directory to save the data files
+        seed: Seed for the random generator shared by all datasets (random if None)
+        csv: Also write CSV copies for consumers that cannot read Parquet
     """
     os.makedirs(output_dir, exist_ok=True)
     
+    # One generator for all datasets so a seed reproduces the whole set
+    rng = np.random.default_rng(seed)
+    
+    def save(df, name):
+        # Parquet keeps the date and category dtypes, so loaders do not need to re-parse them
+        df.to_parquet(os.path.join(output_dir, f'{name}.parquet'), compression='zstd', index=False)
+        if csv:
+            df.to_csv(os.path.join(output_dir, f'{name}.csv'), index=False)
+    
     # Generate case data
     print("Generating case data...")
-    case_data = generate_case_data()
-    case_data.to_csv(os.path.join(output_dir, 'case_counts.csv'), index=False)
+    case_data = generate_case_data(rng=rng)
+    save(case_data, 'case_counts')
     print(f"Case data saved with shape: {case_data.shape}")
     
     # Generate weather data
     print("Generating weather data...")
-    weather_data = generate_weather_data()
-    weather_data.to_csv(os.path.join(output_dir, 'weather_data.csv'), index=False)
+    weather_data = generate_weather_data(rng=rng)
+    save(weather_data, 'weather_data')
     print(f"Weather data saved with shape: {weather_data.shape}")
     
     # Generate wastewater data based on case data
     print("Generating wastewater data...")
-    wastewater_data = generate_wastewater_data(case_data)
-    wastewater_data.to_csv(os.path.join(output_dir, 'wastewater_data.csv'), index=False)
+    wastewater_data = generate_wastewater_data(case_data, rng=rng)
+    save(wastewater_data, 'wastewater_data')
     print(f"Wastewater data saved with shape: {wastewater_data.shape}")
     
     print(f"All synthetic data saved to {output_dir}")
 
 if __name__ == "__main__":
-    save_synthetic_data()
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Generate synthetic outbreak data")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for reproducible data (random if omitted)")
+    parser.add_argument("--csv", action="store_true", help="Also write CSV copies of the data files")
+    args = parser.parse_args()
+    
+    save_synthetic_data(seed=args.seed, csv=args.csv)
\ No newline at end of file
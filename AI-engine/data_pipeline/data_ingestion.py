@@ -1,8 +1,40 @@
 import pandas as pd
 import os
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, List, Optional, Union
 
+
+@lru_cache(maxsize=16)
+def _read_csv_cached(file_path: str, mtime: float) -> pd.DataFrame:
+    """
+    Read a CSV file through a sibling Parquet file, memoized per path and modification time.
+    
+    The Parquet copy is written on the first read and reused while it is newer than the CSV,
+    so repeated loads skip CSV parsing entirely.
+    
+    Args:
+        file_path: Path to the CSV file
+        mtime: Modification time of the CSV file (part of the cache key)
+        
+    Returns:
+        DataFrame with the file contents (shared; callers must copy before modifying)
+    """
+    parquet_path = os.path.splitext(file_path)[0] + ".parquet"
+    
+    if os.path.exists(parquet_path) and os.path.getmtime(parquet_path) >= mtime:
+        return pd.read_parquet(parquet_path, engine='pyarrow')
+    
+    # Regions repeat on every row, so read them straight into a categorical
+    df = pd.read_csv(file_path, parse_dates=['date'], dtype={'region': 'category'})
+    
+    try:
+        df.to_parquet(parquet_path, engine='pyarrow', compression='zstd', index=False)
+    except Exception as e:
+        print(f"Could not write Parquet cache {parquet_path}: {e}")
+    
+    return df
+
 class DataIngestion:
     """
     Class for ingesting time-series data from multiple sources.
@@ -18,9 +50,25 @@ class DataIngestion:
         """
         self.data_dir = data_dir
         
+    def _read_data(self, file_path: str) -> pd.DataFrame:
+        """
+        Read a data file via the cached Parquet copy of the CSV, or the Parquet file alone if there is no CSV.
+        
+        Args:
+            file_path: Path to the CSV file
+            
+        Returns:
+            DataFrame with the file contents
+        """
+        if os.path.exists(file_path):
+            return _read_csv_cached(file_path, os.path.getmtime(file_path)).copy()
+        
+        # Synthetic data is written as Parquet only by default
+        return pd.read_parquet(os.path.splitext(file_path)[0] + ".parquet", engine='pyarrow')
+    
     def load_case_data(self, file_path: Optional[str] = None) -> pd.DataFrame:
         """
-        Load case count data from CSV file.
+        Load case count data from CSV file (or its Parquet version).
         
         Args:
             file_path: Path to the case data file
@@ -32,7 +80,7 @@ class DataIngestion:
             file_path = os.path.join(self.data_dir, "case_counts.csv")
             
         try:
-            df = pd.read_csv(file_path, parse_dates=['date'])
+            df = self._read_data(file_path)
             print(f"Successfully loaded case data from {file_path}")
             return df
         except Exception as e:
@@ -42,7 +90,7 @@ class DataIngestion:
     
     def load_weather_data(self, file_path: Optional[str] = None) -> pd.DataFrame:
         """
-        Load weather data from CSV file.
+        Load weather data from CSV file (or its Parquet version).
         
         Args:
             file_path: Path to the weather data file
@@ -54,7 +102,7 @@ class DataIngestion:
             file_path = os.path.join(self.data_dir, "weather_data.csv")
             
         try:
-            df = pd.read_csv(file_path, parse_dates=['date'])
+            df = self._read_data(file_path)
             print(f"Successfully loaded weather data from {file_path}")
             return df
         except Exception as e:
@@ -64,7 +112,7 @@ class DataIngestion:
     
     def load_wastewater_data(self, file_path: Optional[str] = None) -> pd.DataFrame:
         """
-        Load wastewater viral load data from CSV file.
+        Load wastewater viral load data from CSV file (or its Parquet version).
         
         Args:
             file_path: Path to the wastewater data file
@@ -76,7 +124,7 @@ class DataIngestion:
             file_path = os.path.join(self.data_dir, "wastewater_data.csv")
             
         try:
-            df = pd.read_csv(file_path, parse_dates=['date'])
+            df = self._read_data(file_path)
             print(f"Successfully loaded wastewater data from {file_path}")
             return df
         except Exception as e:
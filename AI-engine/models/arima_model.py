@@ -1,57 +1,227 @@
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from statsmodels.tsa.arima.model import ARIMA
 from typing import Dict, List, Tuple, Optional
 import pickle
 import os
+from concurrent.futures import ProcessPoolExecutor
+from models.utils import region_slices, resolve_n_jobs, worker_context
+
+def _lag_matrix(x: np.ndarray, lags: int) -> np.ndarray:
+    """
+    Build the matrix of lagged values used to regress x[t] on x[t-1], ..., x[t-lags].
+    
+    Args:
+        x: 1-D series
+        lags: Number of lags
+        
+    Returns:
+        Array of shape (len(x) - lags, lags) whose row i holds x[i+lags-1], ..., x[i]
+    """
+    if lags == 0:
+        return np.empty((len(x), 0))
+    return sliding_window_view(x, lags)[:-1, ::-1]
+
+class CSSARIMAResult:
+    """
+    ARIMA coefficients fitted by conditional least squares, with the same forecast(steps)
+    interface as a statsmodels ARIMA result.
+    """
+    
+    def __init__(self, order: Tuple[int, int, int], const: float, ar: np.ndarray, ma: np.ndarray,
+                 diffed_tail: np.ndarray, resid_tail: np.ndarray, level_tails: List[float]):
+        """
+        Initialize the fitted model.
+        
+        Args:
+            order: ARIMA order (p, d, q)
+            const: Intercept of the differenced series
+            ar: AR coefficients for lags 1..p
+            ma: MA coefficients for lags 1..q
+            diffed_tail: Last p values of the differenced series
+            resid_tail: Last q residuals
+            level_tails: Last value of the series at each differencing level, outermost first
+        """
+        self.order = order
+        self.const = const
+        self.ar = ar
+        self.ma = ma
+        self.diffed_tail = diffed_tail
+        self.resid_tail = resid_tail
+        self.level_tails = level_tails
+    
+    def forecast(self, steps: int = 1) -> np.ndarray:
+        """
+        Forecast the series, feeding predictions back in and taking future residuals as zero.
+        
+        Args:
+            steps: Number of steps to forecast
+            
+        Returns:
+            Array of forecasts on the original (undifferenced) scale
+        """
+        p, _, q = self.order
+        diffed = np.concatenate([self.diffed_tail, np.zeros(steps)])
+        resid = np.concatenate([self.resid_tail, np.zeros(steps)])
+        
+        for step in range(steps):
+            diffed[p + step] = (self.const
+                                + self.ar @ diffed[step:p + step][::-1]
+                                + self.ma @ resid[step:q + step][::-1])
+        
+        # Undo the differencing, innermost level first
+        forecast = diffed[p:]
+        for level_tail in reversed(self.level_tails):
+            forecast = level_tail + np.cumsum(forecast)
+        return forecast
+
+def fit_css_arima(series: np.ndarray, order: Tuple[int, int, int]) -> CSSARIMAResult:
+    """
+    Fit an ARIMA model by conditional least squares (Hannan-Rissanen two-stage regression).
+    
+    A long AR regression estimates the innovations, then the differenced series is regressed on
+    its own p lags and q lags of those innovations. This is a few least-squares solves instead
+    of a full likelihood optimization.
+    
+    Args:
+        series: Target series, sorted by date
+        order: ARIMA order (p, d, q)
+        
+    Returns:
+        Fitted CSSARIMAResult
+    """
+    p, d, q = order
+    
+    # Gaps from the outer date alignment are at the ends of the series, so drop them
+    diffed = np.asarray(series, dtype=float)
+    diffed = diffed[~np.isnan(diffed)]
+    not_enough_data = ValueError(f"Not enough observations ({len(diffed)}) to fit ARIMA{order}")
+    
+    # Difference d times, remembering the last value of each level to integrate forecasts
+    level_tails = []
+    for _ in range(d):
+        if len(diffed) == 0:
+            raise not_enough_data
+        level_tails.append(diffed[-1])
+        diffed = np.diff(diffed)
+    
+    # Like statsmodels, only fit an intercept when the series is not differenced
+    intercept = 1 if d == 0 else 0
+    
+    # Stage 1: estimate the innovations with a long AR regression (only needed for MA terms)
+    if q > 0:
+        long_lags = max(p + q, min(20, len(diffed) // 4))
+        if len(diffed) <= 2 * long_lags + 1:
+            raise not_enough_data
+        X_long = np.column_stack([np.ones(len(diffed) - long_lags), _lag_matrix(diffed, long_lags)])
+        y_long = diffed[long_lags:]
+        innovations = y_long - X_long @ np.linalg.lstsq(X_long, y_long, rcond=None)[0]
+        diffed = diffed[long_lags:]
+    else:
+        innovations = np.zeros(len(diffed))
+    
+    # Stage 2: regress the series on its own lags and the lagged innovations
+    start = max(p, q)
+    if len(diffed) - start <= intercept + p + q:
+        raise not_enough_data
+    y = diffed[start:]
+    X = np.column_stack([
+        np.ones((len(y), intercept)),
+        _lag_matrix(diffed, p)[start - p:],
+        _lag_matrix(innovations, q)[start - q:]
+    ])
+    
+    params = np.linalg.lstsq(X, y, rcond=None)[0]
+    resid = y - X @ params
+    
+    return CSSARIMAResult(
+        order=order,
+        const=params[0] if intercept else 0.0,
+        ar=params[intercept:intercept + p],
+        ma=params[intercept + p:],
+        diffed_tail=diffed[len(diffed) - p:],
+        resid_tail=resid[len(resid) - q:],
+        level_tails=level_tails
+    )
+
+def _fit_one(region, series: np.ndarray, order: Tuple[int, int, int], method: str = 'mle'):
+    """
+    Fit an ARIMA model for one region. Defined at module level so it can run in a worker process.
+    
+    Args:
+        region: Region the series belongs to
+        series: Target series for the region, sorted by date
+        order: ARIMA order (p, d, q)
+        method: 'mle' for the statsmodels fit, 'css' for the least-squares fit
+        
+    Returns:
+        Tuple of (region, fitted model), with None as the model if fitting failed
+    """
+    try:
+        if method == 'css':
+            return region, fit_css_arima(series, order)
+        return region, ARIMA(series, order=order).fit()
+    except Exception as e:
+        print(f"Error training ARIMA model for {region}: {e}")
+        return region, None
 
 class ARIMAModel:
     """
     ARIMA model for univariate time series forecasting.
     """
     
-    def __init__(self, order: Tuple[int, int, int] = (5, 1, 1)):
+    def __init__(self, order: Tuple[int, int, int] = (5, 1, 1), method: str = 'mle'):
         """
         Initialize the ARIMA model.
         
         Args:
             order: ARIMA order (p, d, q)
+            method: 'mle' to fit with statsmodels (full likelihood, diagnostics available),
+                    'css' for the much faster conditional least-squares fit
         """
         self.order = order
+        self.method = method
         self.models = {}  # Dictionary to store models for each region
         
-    def train(self, df: pd.DataFrame, target_col: str = 'cases_cases'):
+    def train(self, df: pd.DataFrame, target_col: str = 'cases_cases', n_jobs: Optional[int] = None):
         """
         Train ARIMA models for each region in the dataset.
         
+        Regions are independent, so statsmodels fits run in parallel worker processes.
+        
         Args:
             df: DataFrame with time series data
             target_col: Target column to forecast
+            n_jobs: Number of worker processes (a few CPUs if None, 1 to fit in this process)
         """
-        # Group data by region
-        grouped = df.groupby('region')
+        # Sort once so every region's slice is already in date order
+        df = df.sort_values(['region', 'date'])
+        
+        # Slice the target series for each region out of one array
+        target = df[target_col].to_numpy(dtype=float)
+        region_series = {region: target[rows] for region, rows in region_slices(df['region'])}
         
-        # Train a model for each region
-        for region, group_df in grouped:
+        for region in region_series:
             print(f"Training ARIMA model for {region}...")
-            
-            # Sort by date
-            group_df = group_df.sort_values('date')
-            
-            # Extract the target series
-            series = group_df[target_col].astype(float)
-            
-            try:
-                # Fit ARIMA model
-                model = ARIMA(series, order=self.order)
-                fitted_model = model.fit()
-                
-                # Store the fitted model
+        
+        # Fit the models, one task per region
+        regions = list(region_series)
+        orders = [self.order] * len(regions)
+        methods = [self.method] * len(regions)
+        n_jobs = resolve_n_jobs(n_jobs)
+        if n_jobs == 1 or len(regions) <= 1 or self.method == 'css':
+            # The least-squares fit is cheaper than starting worker processes
+            results = map(_fit_one, regions, region_series.values(), orders, methods)
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs, mp_context=worker_context()) as executor:
+                results = list(executor.map(_fit_one, regions, region_series.values(), orders, methods))
+        
+        # Store the fitted models
+        for region, fitted_model in results:
+            if fitted_model is not None:
                 self.models[region] = fitted_model
                 print(f"Successfully trained ARIMA model for {region}")
-                
-            except Exception as e:
-                print(f"Error training ARIMA model for {region}: {e}")
     
     def forecast(self, df: pd.DataFrame, horizon: int = 14) -> pd.DataFrame:
         """
@@ -64,48 +234,41 @@ class ARIMAModel:
         Returns:
             DataFrame with forecasts
         """
-        forecasts = []
+        region_forecasts = []
         
-        # Group data by region
-        grouped = df.groupby('region')
+        # Get the last date in the data for each region (no per-region slicing or sorting needed)
+        last_dates = df.groupby('region', sort=False, observed=True)['date'].max()
         
         # Generate forecasts for each region
-        for region, group_df in grouped:
+        for region, last_date in last_dates.items():
             if region not in self.models:
                 print(f"No trained model found for {region}, skipping...")
                 continue
-                
-            # Sort by date
-            group_df = group_df.sort_values('date')
-            
-            # Get the last date in the data
-            last_date = group_df['date'].max()
             
             # Generate forecast dates
-            forecast_dates = [last_date + pd.Timedelta(days=i+1) for i in range(horizon)]
+            forecast_dates = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=horizon, freq='D')
             
             try:
                 # Generate forecast
                 model = self.models[region]
-                forecast_result = model.forecast(steps=horizon)
+                forecast_result = np.asarray(model.forecast(steps=horizon), dtype=float)
                 
-                # Create forecast DataFrame
-                for i, (date, value) in enumerate(zip(forecast_dates, forecast_result)):
-                    forecasts.append({
-                        'date': date,
-                        'region': region,
-                        'forecast': max(0, value),  # Ensure non-negative forecasts
-                        'forecast_horizon': i + 1
-                    })
+                # Create forecast DataFrame for the region
+                region_forecasts.append(pd.DataFrame({
+                    'date': forecast_dates,
+                    'region': region,
+                    'forecast': np.clip(forecast_result, 0, None),  # Ensure non-negative forecasts
+                    'forecast_horizon': np.arange(1, horizon + 1)
+                }))
                     
             except Exception as e:
                 print(f"Error generating forecast for {region}: {e}")
         
-        # Convert to DataFrame
-        if not forecasts:
+        # Combine regions into one DataFrame
+        if not region_forecasts:
             return pd.DataFrame(columns=['date', 'region', 'forecast', 'forecast_horizon'])
             
-        forecast_df = pd.DataFrame(forecasts)
+        forecast_df = pd.concat(region_forecasts, ignore_index=True)
         return forecast_df
     
     def save_models(self, path: str = "../models/arima_models.pkl"):
@@ -1,12 +1,16 @@
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 import tensorflow as tf
 from tensorflow.keras.models import Sequential, load_model
 from tensorflow.keras.layers import LSTM, Dense, Dropout
 from tensorflow.keras.callbacks import EarlyStopping
-from sklearn.preprocessing import MinMaxScaler
 import os
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional
+from models.utils import region_slices
+
+# Largest absolute difference allowed between TFLite and Keras predictions (on the [0, 1] scaled target)
+TFLITE_TOLERANCE = 1e-2
 
 class LSTMModel:
     """
@@ -23,8 +27,10 @@ class LSTMModel:
         """
         self.sequence_length = sequence_length
         self.n_features = n_features
+        self.feature_cols = None  # Feature columns used in training, reused by forecast
         self.models = {}  # Dictionary to store models for each region
-        self.scalers = {}  # Dictionary to store scalers for each region
+        self.scalers = {}  # Dictionary to store (min, range) scaling arrays for each region
+        self._predict_fns = {}  # Compiled single-step predict functions for each region
         
     def _create_sequences(self, data: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
         """
@@ -36,11 +42,78 @@ class LSTMModel:
         Returns:
             Tuple of (X, y) where X is the input sequences and y is the target values
         """
-        X, y = [], []
-        for i in range(len(data) - self.sequence_length):
-            X.append(data[i:i + self.sequence_length])
-            y.append(data[i + self.sequence_length, 0])  # Target is the first column (cases)
-        return np.array(X), np.array(y)
+        if len(data) <= self.sequence_length:
+            return np.empty((0, self.sequence_length, data.shape[1])), np.empty(0)
+        
+        # Every window of sequence_length rows as a strided view; the last one has no next value to predict
+        windows = sliding_window_view(data, window_shape=(self.sequence_length, data.shape[1]))[:, 0]
+        X = np.ascontiguousarray(windows[:-1])
+        y = data[self.sequence_length:, 0]  # Target is the first column (cases)
+        return X, y
+    
+    def _predict_step(self, region) -> Callable:
+        """
+        Get a compiled function that predicts one step with the region's model.
+        
+        Calling the model through a cached tf.function avoids the per-call setup of model.predict,
+        and the fixed input signature means it is traced only once. Regions loaded with a TFLite
+        model already have an interpreter-based function cached by load_models.
+        
+        Args:
+            region: Region whose model to use
+            
+        Returns:
+            tf.function mapping a (batch, sequence_length, n_features) float32 array to predictions
+        """
+        if region not in self._predict_fns:
+            model = self.models[region]
+            self._predict_fns[region] = tf.function(
+                lambda x: model(x, training=False),
+                input_signature=[tf.TensorSpec([None, self.sequence_length, None], tf.float32)]
+            )
+        return self._predict_fns[region]
+    
+    @staticmethod
+    def _tflite_predict_step(model_path: Optional[str] = None, model_content: Optional[bytes] = None) -> Callable:
+        """
+        Get a function that predicts one step with a TFLite model.
+        
+        Args:
+            model_path: Path to the .tflite model file
+            model_content: Serialized TFLite model, used instead of model_path
+            
+        Returns:
+            Function mapping a (1, sequence_length, n_features) float32 array to predictions
+        """
+        interpreter = tf.lite.Interpreter(model_path=model_path, model_content=model_content)
+        interpreter.allocate_tensors()
+        input_index = interpreter.get_input_details()[0]['index']
+        output_index = interpreter.get_output_details()[0]['index']
+        
+        def predict_step(x):
+            interpreter.set_tensor(input_index, x)
+            interpreter.invoke()
+            return interpreter.get_tensor(output_index)
+        
+        return predict_step
+    
+    def _tflite_matches_keras(self, model: tf.keras.Model, predict_step: Callable) -> bool:
+        """
+        Check that a TFLite model predicts the same as its Keras model, within TFLITE_TOLERANCE.
+        
+        Args:
+            model: Keras model
+            predict_step: TFLite predict function for the same model
+            
+        Returns:
+            True if the predictions agree on a probe batch of scaled inputs
+        """
+        n_features = model.input_shape[-1]
+        probe = np.random.default_rng(0).random((4, 1, self.sequence_length, n_features), dtype=np.float32)
+        
+        keras_pred = model(probe[:, 0], training=False).numpy().ravel()
+        tflite_pred = np.array([np.asarray(predict_step(x)).ravel()[0] for x in probe])
+        return bool(np.allclose(keras_pred, tflite_pred, atol=TFLITE_TOLERANCE))
     
     def _build_model(self, input_shape: Tuple[int, int]) -> tf.keras.Model:
         """
@@ -73,8 +146,8 @@ class LSTMModel:
             target_col: Target column to forecast
             feature_cols: List of feature columns to use (if None, will use all numeric columns)
         """
-        # Group data by region
-        grouped = df.groupby('region')
+        # Sort once, so every region's rows are one contiguous block already in date order
+        df = df.sort_values(['region', 'date'])
         
         # Determine feature columns if not provided
         if feature_cols is None:
@@ -82,27 +155,26 @@ class LSTMModel:
             feature_cols = [col for col in df.select_dtypes(include=[np.number]).columns 
                            if col != target_col]
         
-        # Update n_features
+        # Update feature columns and n_features
+        self.feature_cols = list(feature_cols)
         self.n_features = len(feature_cols) + 1  # +1 for target column
         
+        # Target and features for all regions as one array, target first
+        all_data = df[[target_col] + list(feature_cols)].to_numpy(dtype=float)
+        
         # Train a model for each region
-        for region, group_df in grouped:
+        for region, rows in region_slices(df['region']):
             print(f"Training LSTM model for {region}...")
             
-            # Sort by date
-            group_df = group_df.sort_values('date')
-            
-            # Extract features and target
-            features = group_df[feature_cols].values
-            target = group_df[[target_col]].values
-            
-            # Combine target and features
-            data = np.concatenate([target, features], axis=1)
+            # Slice the region's target and features
+            data = all_data[rows]
             
-            # Scale the data
-            scaler = MinMaxScaler()
-            scaled_data = scaler.fit_transform(data)
-            self.scalers[region] = scaler
+            # Min-max scale each column to [0, 1]; constant columns keep a range of 1 and scale to 0
+            data_min = np.nanmin(data, axis=0)
+            data_range = np.nanmax(data, axis=0) - data_min
+            data_range[data_range == 0] = 1.0
+            scaled_data = (data - data_min) / data_range
+            self.scalers[region] = (data_min, data_range)
             
             # Create sequences
             X, y = self._create_sequences(scaled_data)
@@ -139,6 +211,7 @@ class LSTMModel:
                 
                 # Store the trained model
                 self.models[region] = model
+                self._predict_fns.pop(region, None)
                 print(f"Successfully trained LSTM model for {region}")
                 
             except Exception as e:
@@ -151,41 +224,41 @@ class LSTMModel:
         Args:
             df: DataFrame with historical data
             horizon: Forecast horizon in days
-            feature_cols: List of feature columns to use (must match training)
+            feature_cols: List of feature columns to use (must match training; the training columns if None)
             
         Returns:
             DataFrame with forecasts
         """
         forecasts = []
         
-        # Group data by region
-        grouped = df.groupby('region')
+        # Sort once, so every region's rows are one contiguous block already in date order
+        df = df.sort_values(['region', 'date'])
         
-        # Determine feature columns if not provided
+        # Determine feature columns if not provided, reusing the training columns when known
+        if feature_cols is None:
+            feature_cols = self.feature_cols
         if feature_cols is None:
             # Use all numeric columns except date and region
             feature_cols = [col for col in df.select_dtypes(include=[np.number]).columns 
                            if col not in ['forecast', 'forecast_horizon']]
         
         # Generate forecasts for each region
-        for region, group_df in grouped:
+        for region, rows in region_slices(df['region']):
             if region not in self.models or region not in self.scalers:
                 print(f"No trained model found for {region}, skipping...")
                 continue
-                
-            # Sort by date
-            group_df = group_df.sort_values('date')
+            
+            group_df = df.iloc[rows]
             
             # Get the last date in the data
             last_date = group_df['date'].max()
             
             # Generate forecast dates
-            forecast_dates = [last_date + pd.Timedelta(days=i+1) for i in range(horizon)]
+            forecast_dates = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=horizon, freq='D')
             
             try:
-                # Get the model and scaler
-                model = self.models[region]
-                scaler = self.scalers[region]
+                # Get the scaling arrays
+                data_min, data_range = self.scalers[region]
                 
                 # Extract the last sequence_length days of data
                 last_sequence = group_df.tail(self.sequence_length)
@@ -198,62 +271,55 @@ class LSTMModel:
                 data = np.concatenate([target, features], axis=1)
                 
                 # Scale the data
-                scaled_data = scaler.transform(data)
+                scaled_data = (data - data_min) / data_range
                 
-                # Reshape for LSTM input
-                current_sequence = scaled_data.reshape(1, self.sequence_length, self.n_features)
+                # Input buffer for the LSTM, allocated once and shifted in place every step
+                current_sequence = np.empty((1, self.sequence_length, self.n_features), dtype=np.float32)
+                current_sequence[0] = scaled_data[-self.sequence_length:]
                 
-                # Generate forecasts iteratively
-                forecast_values = []
+                # Generate forecasts iteratively with the compiled single-step function
+                predict_step = self._predict_step(region)
+                forecast_values = np.empty(horizon)
                 for i in range(horizon):
                     # Predict the next value
-                    next_pred = model.predict(current_sequence, verbose=0)[0, 0]
-                    forecast_values.append(next_pred)
-                    
-                    # Create a new row with the prediction and last feature values
-                    new_row = np.zeros((1, self.n_features))
-                    new_row[0, 0] = next_pred
-                    new_row[0, 1:] = scaled_data[-1, 1:]  # Use last feature values
+                    next_pred = float(predict_step(current_sequence)[0, 0])
+                    forecast_values[i] = next_pred
                     
-                    # Update the sequence by removing the first timestep and adding the new prediction
-                    current_sequence = np.append(current_sequence[:, 1:, :], 
-                                               new_row.reshape(1, 1, self.n_features), 
-                                               axis=1)
+                    # Shift the sequence by one timestep and fill the new last row with the
+                    # prediction and the last feature values
+                    current_sequence[0, :-1] = current_sequence[0, 1:]
+                    current_sequence[0, -1, 0] = next_pred
+                    current_sequence[0, -1, 1:] = scaled_data[-1, 1:]
                 
-                # Inverse transform to get actual values
-                # Create a dummy array with the same shape as the original data
-                dummy = np.zeros((horizon, self.n_features))
-                dummy[:, 0] = forecast_values
-                dummy[:, 1:] = scaled_data[-1, 1:]  # Use last feature values for all forecasts
+                # Inverse transform the target column to get actual values
+                forecast_values_rescaled = forecast_values * data_range[0] + data_min[0]
                 
-                # Inverse transform
-                forecast_values_rescaled = scaler.inverse_transform(dummy)[:, 0]
-                
-                # Create forecast DataFrame
-                for i, (date, value) in enumerate(zip(forecast_dates, forecast_values_rescaled)):
-                    forecasts.append({
-                        'date': date,
-                        'region': region,
-                        'forecast': max(0, value),  # Ensure non-negative forecasts
-                        'forecast_horizon': i + 1
-                    })
+                # Create forecast DataFrame for the region
+                forecasts.append(pd.DataFrame({
+                    'date': forecast_dates,
+                    'region': region,
+                    'forecast': np.maximum(forecast_values_rescaled, 0.0),  # Ensure non-negative forecasts
+                    'forecast_horizon': np.arange(1, horizon + 1)
+                }))
                     
             except Exception as e:
                 print(f"Error generating forecast for {region}: {e}")
         
-        # Convert to DataFrame
+        # Combine regions into one DataFrame
         if not forecasts:
             return pd.DataFrame(columns=['date', 'region', 'forecast', 'forecast_horizon'])
             
-        forecast_df = pd.DataFrame(forecasts)
+        forecast_df = pd.concat(forecasts, ignore_index=True)
         return forecast_df
     
-    def save_models(self, base_path: str = "../models/lstm_models"):
+    def save_models(self, base_path: str = "../models/lstm_models", tflite: bool = False):
         """
         Save trained models and scalers to disk.
         
         Args:
             base_path: Base path to save the models
+            tflite: Also save float16 TFLite versions of the models, used for forecasting when loaded.
+                    A version is only saved if its predictions match the Keras model's.
         """
         os.makedirs(base_path, exist_ok=True)
         
@@ -261,6 +327,25 @@ class LSTMModel:
         for region, model in self.models.items():
             model_path = os.path.join(base_path, f"{region}_model.h5")
             model.save(model_path)
+            
+            if tflite:
+                try:
+                    # Float16 weights halve the model size and run on the TFLite interpreter's optimized kernels
+                    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+                    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+                    converter.target_spec.supported_types = [tf.float16]
+                    # LSTM layers may need TensorFlow ops that have no TFLite builtin
+                    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS]
+                    tflite_model = converter.convert()
+                    
+                    if not self._tflite_matches_keras(model, self._tflite_predict_step(model_content=tflite_model)):
+                        print(f"TFLite predictions for {region} differ from the Keras model, keeping Keras only")
+                        continue
+                    
+                    with open(os.path.join(base_path, f"{region}_model.tflite"), 'wb') as f:
+                        f.write(tflite_model)
+                except Exception as e:
+                    print(f"Error converting LSTM model for {region} to TFLite, keeping Keras only: {e}")
         
         # Save scalers
         import joblib
@@ -286,11 +371,35 @@ class LSTMModel:
                 region = file.replace("_model.h5", "")
                 model_path = os.path.join(base_path, file)
                 self.models[region] = load_model(model_path)
+                self._predict_fns.pop(region, None)
+        
+        # Forecast with the TFLite versions where they were saved and still match the Keras model
+        for region, model in self.models.items():
+            backend = "Keras"
+            tflite_path = os.path.join(base_path, f"{region}_model.tflite")
+            if os.path.exists(tflite_path):
+                try:
+                    predict_step = self._tflite_predict_step(tflite_path)
+                    if self._tflite_matches_keras(model, predict_step):
+                        self._predict_fns[region] = predict_step
+                        backend = "TFLite (float16)"
+                    else:
+                        print(f"TFLite predictions for {region} differ from the Keras model, ignoring {tflite_path}")
+                except Exception as e:
+                    print(f"Error loading TFLite model for {region}: {e}")
+            print(f"LSTM model for {region} forecasts with {backend}")
         
         # Load scalers
         import joblib
         scaler_path = os.path.join(base_path, "scalers.pkl")
         if os.path.exists(scaler_path):
             self.scalers = joblib.load(scaler_path)
+            
+            # Files saved before the NumPy scaling hold fitted MinMaxScaler objects; keep their (min, range)
+            for region, scaler in self.scalers.items():
+                if hasattr(scaler, 'data_min_') and hasattr(scaler, 'data_range_'):
+                    data_range = np.array(scaler.data_range_, dtype=float)
+                    data_range[data_range == 0] = 1.0
+                    self.scalers[region] = (np.array(scaler.data_min_, dtype=float), data_range)
         
         print(f"Models and scalers loaded from {base_path}")
\ No newline at end of file
@@ -1,16 +1,58 @@
+import math
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Optional
-from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+# Abramowitz & Stegun 7.1.26 coefficients for erf (absolute error below 1.5e-7)
+ERF_P = 0.3275911
+ERF_COEFFS = (1.061405429, -1.453152027, 1.421413741, -0.284496736, 0.254829592)
+
+# Normalizing constants of the Gaussian CDF, PDF and CRPS (Python floats, so float32 arrays stay float32)
+INV_SQRT_2 = 1.0 / math.sqrt(2.0)
+INV_SQRT_PI = 1.0 / math.sqrt(math.pi)
+INV_SQRT_2PI = 1.0 / math.sqrt(2.0 * math.pi)
+
+def _erf(x: np.ndarray) -> np.ndarray:
+    """
+    Branch-free polynomial approximation of the error function, built from NumPy ufuncs only.
+    
+    Args:
+        x: Input values (float32 input is evaluated in float32)
+        
+    Returns:
+        erf(x) values
+    """
+    x = np.asarray(x)
+    x = x.astype(np.result_type(x, np.float32), copy=False)
+    abs_x = np.abs(x)
+    t = 1.0 / (1.0 + ERF_P * abs_x)
+    
+    # Horner evaluation of a1*t + a2*t^2 + ... + a5*t^5, updated in place
+    poly = np.zeros_like(t)
+    for coeff in ERF_COEFFS:
+        poly += coeff
+        poly *= t
+    
+    # sign(x) * (1 - poly * exp(-x^2)), reusing the polynomial's buffer
+    poly *= np.exp(-abs_x * abs_x)
+    np.subtract(1.0, poly, out=poly)
+    poly *= np.sign(x)
+    return poly
 
 class ModelEvaluator:
     """
     Class for evaluating forecasting model performance.
     """
     
-    def __init__(self):
-        """Initialize the ModelEvaluator class."""
-        pass
+    def __init__(self, fast_cdf: bool = False):
+        """
+        Initialize the ModelEvaluator class.
+        
+        Args:
+            fast_cdf: Use the logistic approximation of the normal CDF in CRPS
+                      (cheaper, absolute CDF error below 0.01)
+        """
+        self.fast_cdf = fast_cdf
         
     def evaluate(self, actual: pd.DataFrame, forecast: pd.DataFrame, 
                 target_col: str = 'cases_cases', forecast_col: str = 'forecast') -> Dict[str, Dict[str, float]]:
@@ -26,113 +68,161 @@ class ModelEvaluator:
         Returns:
             Dictionary with evaluation metrics by region
         """
-        # Merge actual and forecast data
-        merged = pd.merge(
-            actual[['date', 'region', target_col]],
-            forecast[['date', 'region', forecast_col, 'forecast_horizon']],
-            on=['date', 'region'],
+        # Prediction interval columns are carried through the merge when available
+        has_intervals = 'forecast_lower' in forecast.columns and 'forecast_upper' in forecast.columns
+        interval_cols = ['forecast_lower', 'forecast_upper'] if has_intervals else []
+        
+        # Join actual and forecast data on a (date, region) index rather than merging on columns
+        keys = ['date', 'region']
+        merged = actual[keys + [target_col]].set_index(keys).join(
+            forecast[keys + [forecast_col, 'forecast_horizon'] + interval_cols].set_index(keys),
             how='inner'
-        )
+        ).reset_index()
         
         if merged.empty:
             print("No matching data points for evaluation")
             return {}
         
-        # Group by region and forecast horizon
-        grouped = merged.groupby(['region', 'forecast_horizon'])
+        # Integer code for every (region, forecast horizon) group, numbered in sorted group order
+        codes, groups = pd.MultiIndex.from_arrays(
+            [merged['region'], merged['forecast_horizon']]
+        ).factorize(sort=True)
+        counts = np.bincount(codes, minlength=len(groups))
+        
+        def group_mean(values):
+            # Mean of a per-row array within each group, in one pass over all rows
+            return np.bincount(codes, weights=values, minlength=len(groups)) / counts
+        
+        # Extract actual and forecast values in single precision (the processed data is stored as float32);
+        # the per-group sums are still accumulated in double precision by np.bincount
+        y_true = merged[target_col].to_numpy(dtype=np.float32)
+        y_pred = merged[forecast_col].to_numpy(dtype=np.float32)
+        error = y_true - y_pred
+        
+        # Absolute, squared and relative errors written in place into one buffer
+        row_errors = np.empty((3, len(error)), dtype=np.float32)
+        abs_error, squared_error, relative_error = row_errors
+        np.abs(error, out=abs_error)
+        np.multiply(error, error, out=squared_error)
+        np.maximum(y_true, 1.0, out=relative_error)
+        np.divide(abs_error, relative_error, out=relative_error)
         
-        # Calculate metrics for each group
+        # Calculate metrics for all groups at once
+        mae, mse, mape = (group_mean(values) for values in row_errors)
+        rmse = np.sqrt(mse)
+        mape *= 100
+        
+        # Calculate CRPS (Continuous Ranked Probability Score)
+        # For simplicity, we'll use a Gaussian approximation
+        if has_intervals:
+            # Calculate standard deviation from the prediction interval
+            lower = merged['forecast_lower'].to_numpy(dtype=np.float32)
+            upper = merged['forecast_upper'].to_numpy(dtype=np.float32)
+            std = (upper - lower) / 3.92  # 95% confidence interval is approximately ±1.96 std
+        else:
+            # If no prediction intervals are available, use the standard deviation of each group's errors
+            deviation = error - group_mean(error).astype(np.float32)[codes]
+            std = np.sqrt(group_mean(deviation * deviation)).astype(np.float32)[codes]
+        
+        # Calculate CRPS using the analytical formula for Gaussian distribution
+        crps = group_mean(self._crps_gaussian(y_true, y_pred, std))
+        
+        # Store metrics by region and horizon
         metrics = {}
         
-        for (region, horizon), group in grouped:
-            if region not in metrics:
-                metrics[region] = {}
-                
-            # Extract actual and forecast values
-            y_true = group[target_col].values
-            y_pred = group[forecast_col].values
-            
-            # Calculate metrics
-            mae = mean_absolute_error(y_true, y_pred)
-            rmse = np.sqrt(mean_squared_error(y_true, y_pred))
-            mape = np.mean(np.abs((y_true - y_pred) / np.maximum(1, y_true))) * 100
-            
-            # Calculate CRPS (Continuous Ranked Probability Score)
-            # For simplicity, we'll use a Gaussian approximation
-            if 'forecast_lower' in forecast.columns and 'forecast_upper' in forecast.columns:
-                # Extract prediction intervals
-                lower = group['forecast_lower'].values
-                upper = group['forecast_upper'].values
-                
-                # Calculate standard deviation from the prediction interval
-                std = (upper - lower) / 3.92  # 95% confidence interval is approximately ±1.96 std
-                
-                # Calculate CRPS using the analytical formula for Gaussian distribution
-                crps = np.mean([self._crps_gaussian(y_true[i], y_pred[i], std[i]) for i in range(len(y_true))])
-            else:
-                # If no prediction intervals are available, use a simple approximation
-                std = np.std(y_true - y_pred)
-                crps = np.mean([self._crps_gaussian(y_true[i], y_pred[i], std) for i in range(len(y_true))])
-            
-            # Store metrics
-            metrics[region][f'horizon_{horizon}'] = {
-                'MAE': mae,
-                'RMSE': rmse,
-                'MAPE': mape,
-                'CRPS': crps
+        for (region, horizon), group_mae, group_rmse, group_mape, group_crps in zip(groups, mae, rmse, mape, crps):
+            metrics.setdefault(region, {})[f'horizon_{horizon}'] = {
+                'MAE': group_mae,
+                'RMSE': group_rmse,
+                'MAPE': group_mape,
+                'CRPS': group_crps
             }
         
         return metrics
     
-    def _crps_gaussian(self, y_true: float, mu: float, sigma: float) -> float:
+    def _crps_gaussian(self, y_true: np.ndarray, mu: np.ndarray, sigma: np.ndarray) -> np.ndarray:
         """
-        Calculate CRPS for a Gaussian forecast.
+        Calculate CRPS for Gaussian forecasts, element-wise over arrays (or scalars).
         
         Args:
-            y_true: Actual value
-            mu: Predicted mean
-            sigma: Predicted standard deviation
+            y_true: Actual values
+            mu: Predicted means
+            sigma: Predicted standard deviations
             
         Returns:
-            CRPS value
+            CRPS values
         """
-        # Avoid division by zero
-        if sigma < 1e-6:
-            return abs(y_true - mu)
+        # Work on at least 1-D arrays so intermediate buffers can be updated in place,
+        # in float32 when all inputs are float32 and in float64 otherwise
+        y_true, mu, sigma = (np.asarray(values) for values in (y_true, mu, sigma))
+        dtype = np.result_type(y_true, mu, sigma, np.float32)
+        y_true, mu, sigma = (values.astype(dtype, copy=False) for values in (y_true, mu, sigma))
+        shape = np.broadcast_shapes(y_true.shape, mu.shape, sigma.shape)
+        y_true, mu, sigma = np.broadcast_arrays(np.atleast_1d(y_true), np.atleast_1d(mu), np.atleast_1d(sigma))
+        
+        # Avoid division by zero: near-deterministic forecasts score the absolute error
+        degenerate = sigma < 1e-6
+        sigma = np.where(degenerate, 1.0, sigma)
             
         # Standardized forecast error
-        z = (y_true - mu) / sigma
+        error = y_true - mu
+        z = error / sigma
         
-        # CRPS formula for Gaussian distribution
-        crps = sigma * (z * (2 * self._norm_cdf(z) - 1) + 
-                       2 * self._norm_pdf(z) - 
-                       1 / np.sqrt(np.pi))
+        # CRPS formula for Gaussian distribution, sigma * (z * (2 * cdf - 1) + 2 * pdf - 1 / sqrt(pi)),
+        # accumulated in the CDF's buffer instead of allocating a temporary per operation
+        crps = self._norm_cdf_fast(z) if self.fast_cdf else self._norm_cdf(z)
+        crps *= 2.0
+        crps -= 1.0
+        crps *= z
+        pdf = self._norm_pdf(z)
+        pdf *= 2.0
+        crps += pdf
+        crps -= INV_SQRT_PI
+        crps *= sigma
         
-        return crps
+        np.copyto(crps, np.abs(error), where=degenerate)
+        return crps.reshape(shape)
     
-    def _norm_cdf(self, x: float) -> float:
+    def _norm_cdf(self, x: np.ndarray) -> np.ndarray:
         """
         Standard normal cumulative distribution function.
         
         Args:
-            x: Input value
+            x: Input values
+            
+        Returns:
+            CDF values
+        """
+        cdf = _erf(x * INV_SQRT_2)
+        cdf += 1.0
+        cdf *= 0.5
+        return cdf
+    
+    def _norm_cdf_fast(self, x: np.ndarray) -> np.ndarray:
+        """
+        Logistic approximation of the standard normal CDF, 1 / (1 + exp(-1.702 x)).
+        
+        Written as the equivalent 0.5 * (1 + tanh(0.851 x)), which does not overflow for large |x|.
+        
+        Args:
+            x: Input values
             
         Returns:
-            CDF value
+            Approximate CDF values
         """
-        return 0.5 * (1 + np.math.erf(x / np.sqrt(2)))
+        return 0.5 * (1.0 + np.tanh(0.851 * x))
     
-    def _norm_pdf(self, x: float) -> float:
+    def _norm_pdf(self, x: np.ndarray) -> np.ndarray:
         """
         Standard normal probability density function.
         
         Args:
-            x: Input value
+            x: Input values
             
         Returns:
-            PDF value
+            PDF values
         """
-        return np.exp(-0.5 * x**2) / np.sqrt(2 * np.pi)
+        return np.exp(-0.5 * (x * x)) * INV_SQRT_2PI
     
     def summarize_metrics(self, metrics: Dict[str, Dict[str, Dict[str, float]]]) -> pd.DataFrame:
         """
@@ -144,19 +234,16 @@ class ModelEvaluator:
         Returns:
             DataFrame with summarized metrics
         """
-        rows = []
-        
-        for region, horizons in metrics.items():
-            for horizon, metric_values in horizons.items():
-                row = {
-                    'region': region,
-                    'horizon': horizon.replace('horizon_', '')
-                }
-                row.update(metric_values)
-                rows.append(row)
-        
-        if not rows:
+        # One flat tuple per region and horizon
+        records = [
+            (region, horizon.replace('horizon_', ''),
+             metric_values['MAE'], metric_values['RMSE'], metric_values['MAPE'], metric_values['CRPS'])
+            for region, horizons in metrics.items()
+            for horizon, metric_values in horizons.items()
+        ]
+        
+        if not records:
             return pd.DataFrame()
             
-        df = pd.DataFrame(rows)
+        df = pd.DataFrame.from_records(records, columns=['region', 'horizon', 'MAE', 'RMSE', 'MAPE', 'CRPS'])
         return df
\ No newline at end of file
@@ -4,6 +4,127 @@ from prophet import Prophet
 from typing import Dict, List, Optional
 import pickle
 import os
+from collections.abc import MutableMapping
+from concurrent.futures import ProcessPoolExecutor
+from models.utils import resolve_n_jobs, worker_context
+
+# Columns added to the models as extra regressors when present in the data
+REGRESSOR_COLUMNS = ['temperature', 'humidity', 'precipitation', 'viral_load']
+
+def _fit_one(region, prophet_df: pd.DataFrame, regressor_cols: List[str]):
+    """
+    Fit a Prophet model for one region. Defined at module level so it can run in a worker process.
+    
+    Args:
+        region: Region the data belongs to
+        prophet_df: DataFrame with 'ds', 'y' and regressor columns, sorted by date
+        regressor_cols: Columns to add as extra regressors
+        
+    Returns:
+        Tuple of (region, fitted model), with None as the model if fitting failed
+    """
+    try:
+        # Initialize and fit Prophet model
+        model = Prophet(
+            yearly_seasonality=True,
+            weekly_seasonality=True,
+            daily_seasonality=False,
+            seasonality_mode='multiplicative'
+        )
+        
+        # Add additional regressors if available
+        for col in regressor_cols:
+            model.add_regressor(col)
+        
+        model.fit(prophet_df)
+        return region, model
+        
+    except Exception as e:
+        print(f"Error training Prophet model for {region}: {e}")
+        return region, None
+
+def _forecast_one(region, model: Prophet, group_df: pd.DataFrame, horizon: int) -> Optional[pd.DataFrame]:
+    """
+    Generate the forecast for one region.
+    
+    Args:
+        region: Region to forecast
+        model: Fitted Prophet model for the region
+        group_df: Historical data for the region, sorted by date
+        horizon: Forecast horizon in days
+        
+    Returns:
+        DataFrame with the region's forecasts, or None if forecasting failed
+    """
+    try:
+        # Create future dataframe
+        future = model.make_future_dataframe(periods=horizon)
+        
+        # Add regressors to future dataframe if they were used in training (extra_regressors is keyed by name)
+        regressor_names = [name for name in model.extra_regressors if name in group_df.columns]
+        if regressor_names:
+            # For simplicity, use the last values for future predictions, assigned in one step
+            # In a real application, you might want to forecast these values separately
+            future = future.assign(**group_df[regressor_names].iloc[-1].to_dict())
+        
+        # Generate forecast
+        forecast_result = model.predict(future)
+        
+        # Extract the forecast for the horizon period
+        forecast_result = forecast_result.tail(horizon)
+        
+        # Create forecast DataFrame from whole columns
+        return pd.DataFrame({
+            'date': forecast_result['ds'].to_numpy(),
+            'region': region,
+            'forecast': np.clip(forecast_result['yhat'].to_numpy(), 0, None),  # Ensure non-negative forecasts
+            'forecast_lower': np.clip(forecast_result['yhat_lower'].to_numpy(), 0, None),
+            'forecast_upper': np.clip(forecast_result['yhat_upper'].to_numpy(), 0, None),
+            'forecast_horizon': np.arange(1, len(forecast_result) + 1)
+        })
+            
+    except Exception as e:
+        print(f"Error generating forecast for {region}: {e}")
+        return None
+
+class LazyModelDict(MutableMapping):
+    """
+    Dictionary of region models that unpickles each saved model the first time it is accessed.
+    """
+    
+    def __init__(self, model_paths: Dict[str, str]):
+        """
+        Initialize the dictionary.
+        
+        Args:
+            model_paths: Path of the pickled model for each region
+        """
+        self._model_paths = dict(model_paths)
+        self._models = {}  # Models loaded or assigned so far
+    
+    def __getitem__(self, region):
+        if region not in self._models:
+            with open(self._model_paths[region], 'rb') as f:
+                self._models[region] = pickle.load(f)
+        return self._models[region]
+    
+    def __setitem__(self, region, model):
+        self._models[region] = model
+    
+    def __delitem__(self, region):
+        if region not in self._models and region not in self._model_paths:
+            raise KeyError(region)
+        self._models.pop(region, None)
+        self._model_paths.pop(region, None)
+    
+    def __contains__(self, region):
+        return region in self._models or region in self._model_paths
+    
+    def __iter__(self):
+        return iter(dict.fromkeys([*self._model_paths, *self._models]))
+    
+    def __len__(self):
+        return len(self._model_paths.keys() | self._models.keys())
 
 class ProphetModel:
     """
@@ -14,55 +135,56 @@ class ProphetModel:
         """Initialize the Prophet model."""
         self.models = {}  # Dictionary to store models for each region
         
-    def train(self, df: pd.DataFrame, target_col: str = 'cases_cases'):
+    def train(self, df: pd.DataFrame, target_col: str = 'cases_cases', n_jobs: Optional[int] = None):
         """
         Train Prophet models for each region in the dataset.
         
+        Regions are independent, so their models are fitted in parallel worker processes.
+        
         Args:
             df: DataFrame with time series data
             target_col: Target column to forecast
+            n_jobs: Number of worker processes (a few CPUs if None, 1 to fit in this process)
         """
-        # Group data by region
-        grouped = df.groupby('region')
+        regressor_cols = [col for col in REGRESSOR_COLUMNS if col in df.columns]
+        
+        # Sort once so every region's slice is already in date order
+        df = df.sort_values(['region', 'date'])
+        
+        # Prepare data for Prophet (requires 'ds' and 'y' columns), one frame per region
+        region_frames = {
+            region: group_df.rename(columns={'date': 'ds', target_col: 'y'})
+            for region, group_df in df[['region', 'date', target_col] + regressor_cols]
+                .groupby('region', sort=False, observed=True)
+        }
         
-        # Train a model for each region
-        for region, group_df in grouped:
+        for region in region_frames:
             print(f"Training Prophet model for {region}...")
-            
-            # Sort by date
-            group_df = group_df.sort_values('date')
-            
-            # Prepare data for Prophet (requires 'ds' and 'y' columns)
-            prophet_df = group_df[['date', target_col]].rename(columns={'date': 'ds', target_col: 'y'})
-            
-            try:
-                # Initialize and fit Prophet model
-                model = Prophet(
-                    yearly_seasonality=True,
-                    weekly_seasonality=True,
-                    daily_seasonality=False,
-                    seasonality_mode='multiplicative'
-                )
-                
-                # Add additional regressors if available
-                for col in group_df.columns:
-                    if col in ['temperature', 'humidity', 'precipitation', 'viral_load']:
-                        if f'{col}' in group_df.columns:
-                            model.add_regressor(col)
-                
-                model.fit(prophet_df)
-                
-                # Store the fitted model
+        
+        # Fit the models, one task per region
+        regions = list(region_frames)
+        prophet_dfs = [frame.drop(columns='region') for frame in region_frames.values()]
+        regressor_lists = [regressor_cols] * len(regions)
+        n_jobs = resolve_n_jobs(n_jobs)
+        if n_jobs == 1 or len(regions) <= 1:
+            results = map(_fit_one, regions, prophet_dfs, regressor_lists)
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs, mp_context=worker_context()) as executor:
+                results = list(executor.map(_fit_one, regions, prophet_dfs, regressor_lists))
+        
+        # Store the fitted models
+        for region, model in results:
+            if model is not None:
                 self.models[region] = model
                 print(f"Successfully trained Prophet model for {region}")
-                
-            except Exception as e:
-                print(f"Error training Prophet model for {region}: {e}")
     
     def forecast(self, df: pd.DataFrame, horizon: int = 14) -> pd.DataFrame:
         """
         Generate forecasts for each region.
         
+        Forecasts run in this process: sending every fitted model to worker processes would cost more
+        than predicting a short horizon.
+        
         Args:
             df: DataFrame with historical data
             horizon: Forecast horizon in days
@@ -70,83 +192,66 @@ class ProphetModel:
         Returns:
             DataFrame with forecasts
         """
-        forecasts = []
+        # Sort once so every region's slice is already in date order
+        df = df.sort_values(['region', 'date'])
         
-        # Group data by region
-        grouped = df.groupby('region')
-        
-        # Generate forecasts for each region
-        for region, group_df in grouped:
+        # Generate forecasts for each region that has a trained model
+        forecasts = []
+        for region, group_df in df.groupby('region', sort=False, observed=True):
             if region not in self.models:
                 print(f"No trained model found for {region}, skipping...")
                 continue
-                
-            # Sort by date
-            group_df = group_df.sort_values('date')
             
-            try:
-                # Create future dataframe
-                model = self.models[region]
-                future = model.make_future_dataframe(periods=horizon)
-                
-                # Add regressors to future dataframe if they were used in training
-                for regressor in model.extra_regressors:
-                    if regressor['name'] in group_df.columns:
-                        # For simplicity, use the last value for future predictions
-                        # In a real application, you might want to forecast these values separately
-                        last_value = group_df[regressor['name']].iloc[-1]
-                        future[regressor['name']] = last_value
-                
-                # Generate forecast
-                forecast_result = model.predict(future)
-                
-                # Extract the forecast for the horizon period
-                forecast_result = forecast_result.tail(horizon)
-                
-                # Create forecast DataFrame
-                for i, (date, value) in enumerate(zip(forecast_result['ds'], forecast_result['yhat'])):
-                    forecasts.append({
-                        'date': date,
-                        'region': region,
-                        'forecast': max(0, value),  # Ensure non-negative forecasts
-                        'forecast_lower': max(0, forecast_result['yhat_lower'].iloc[i]),
-                        'forecast_upper': max(0, forecast_result['yhat_upper'].iloc[i]),
-                        'forecast_horizon': i + 1
-                    })
-                    
-            except Exception as e:
-                print(f"Error generating forecast for {region}: {e}")
-        
-        # Convert to DataFrame
+            region_forecast = _forecast_one(region, self.models[region], group_df, horizon)
+            if region_forecast is not None:
+                forecasts.append(region_forecast)
+        
+        # Combine regions into one DataFrame
         if not forecasts:
             return pd.DataFrame(columns=['date', 'region', 'forecast', 'forecast_lower', 'forecast_upper', 'forecast_horizon'])
             
-        forecast_df = pd.DataFrame(forecasts)
+        forecast_df = pd.concat(forecasts, ignore_index=True)
         return forecast_df
     
-    def save_models(self, path: str = "../models/prophet_models.pkl"):
+    def save_models(self, base_path: str = "../models/prophet_models"):
         """
-        Save trained models to disk.
+        Save trained models to disk, one pickle file per region.
         
         Args:
-            path: Path to save the models
+            base_path: Base path to save the models
         """
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, 'wb') as f:
-            pickle.dump(self.models, f)
-        print(f"Models saved to {path}")
+        os.makedirs(base_path, exist_ok=True)
+        
+        for region, model in self.models.items():
+            model_path = os.path.join(base_path, f"{region}_model.pkl")
+            with open(model_path, 'wb') as f:
+                pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+        print(f"Models saved to {base_path}")
     
-    def load_models(self, path: str = "../models/prophet_models.pkl"):
+    def load_models(self, base_path: str = "../models/prophet_models"):
         """
         Load trained models from disk.
         
+        Only the region index is read here; each model is unpickled the first time it is used.
+        A single pickle file holding all models, as written by earlier versions, is loaded directly.
+        
         Args:
-            path: Path to load the models from
+            base_path: Base path to load the models from
         """
-        if not os.path.exists(path):
-            print(f"Model file {path} not found")
+        if not os.path.exists(base_path):
+            print(f"Model directory {base_path} not found")
             return
-            
-        with open(path, 'rb') as f:
-            self.models = pickle.load(f)
-        print(f"Models loaded from {path}")
\ No newline at end of file
+        
+        if os.path.isfile(base_path):
+            with open(base_path, 'rb') as f:
+                self.models = pickle.load(f)
+            print(f"Models loaded from {base_path}")
+            return
+        
+        # Index the saved model files by region
+        model_paths = {
+            file.replace("_model.pkl", ""): os.path.join(base_path, file)
+            for file in sorted(os.listdir(base_path)) if file.endswith("_model.pkl")
+        }
+        self.models = LazyModelDict(model_paths)
+        print(f"Models indexed from {base_path} ({len(model_paths)} regions, loaded on first use)")
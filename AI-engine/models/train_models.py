@@ -34,7 +34,9 @@ def train_and_evaluate_models(data_path=None, forecast_horizons=[7, 14], save_fo
         data = pipeline.run_pipeline()
     else:
         print(f"\nStep 1: Loading processed data from {data_path}...")
-        if data_path.endswith('.csv'):
+        if data_path.endswith('.parquet'):
+            data = pd.read_parquet(data_path)
+        elif data_path.endswith('.csv'):
             data = pd.read_csv(data_path, parse_dates=['date'])
         else:
             # Assume SQLite
@@ -42,6 +44,9 @@ def train_and_evaluate_models(data_path=None, forecast_horizons=[7, 14], save_fo
             storage = DataStorage()
             data = storage.load_from_sqlite('processed_data')
     
+    # Regions are few and repeated, so group and merge on categorical codes instead of strings
+    data['region'] = data['region'].astype('category')
+    
     print(f"Data loaded with shape: {data.shape}")
     print(f"Columns: {data.columns.tolist()}")
     
@@ -50,27 +55,23 @@ def train_and_evaluate_models(data_path=None, forecast_horizons=[7, 14], save_fo
     
     # Group by region
     regions = data['region'].unique()
-    print(f"Found {len(regions)} regions: {regions}")
+    print(f"Found {len(regions)} regions: {regions.tolist()}")
     
-    train_data = {}
-    test_data = {}
+    # Sort once and group without re-sorting, so every region's rows are already in date order
+    data_sorted = data.sort_values(['region', 'date'])
+    region_groups = data_sorted.groupby('region', sort=False, observed=True)
     
-    for region in regions:
-        region_data = data[data['region'] == region].sort_values('date')
-        
-        # Use the last 30 days as test data
-        split_idx = len(region_data) - 30
-        
-        if split_idx <= 0:
-            print(f"Not enough data for region {region}, skipping...")
-            continue
-            
-        train_data[region] = region_data.iloc[:split_idx]
-        test_data[region] = region_data.iloc[split_idx:]
+    # Regions with no more than the 30 test days have nothing left to train on
+    region_sizes = region_groups.size()
+    for region in region_sizes.index[region_sizes <= 30]:
+        print(f"Not enough data for region {region}, skipping...")
     
-    # Combine all regions
-    train_df = pd.concat([df for df in train_data.values()])
-    test_df = pd.concat([df for df in test_data.values()])
+    # Use the last 30 days of each region as test data and the rest as training data,
+    # selected with row masks rather than per-region slices and a concat
+    has_train_data = region_groups['date'].transform('size').to_numpy() > 30
+    is_test = region_groups.cumcount(ascending=False).to_numpy() < 30
+    train_df = data_sorted[has_train_data & ~is_test]
+    test_df = data_sorted[has_train_data & is_test]
     
     print(f"Train data shape: {train_df.shape}")
     print(f"Test data shape: {test_df.shape}")
@@ -124,8 +125,10 @@ def train_and_evaluate_models(data_path=None, forecast_horizons=[7, 14], save_fo
         if save_forecasts:
             output_dir = "../data"
             os.makedirs(output_dir, exist_ok=True)
-            combined_forecast.to_csv(f"{output_dir}/forecast_{horizon}day.csv", index=False)
-            print(f"Saved {horizon}-day forecasts to {output_dir}/forecast_{horizon}day.csv")
+            # Parquet keeps floats binary and typed, so it is smaller and faster to round-trip than CSV
+            forecast_path = f"{output_dir}/forecast_{horizon}day.parquet"
+            combined_forecast.to_parquet(forecast_path, engine='pyarrow', compression='zstd', index=False)
+            print(f"Saved {horizon}-day forecasts to {forecast_path}")
     
     # Step 5: Evaluate forecasts
     print("\nStep 5: Evaluating forecasts...")
@@ -133,21 +136,22 @@ def train_and_evaluate_models(data_path=None, forecast_horizons=[7, 14], save_fo
     evaluator = ModelEvaluator()
     evaluation_results = {}
     
+    # Index the test data by date once, so each horizon looks its dates up in a sorted index
+    test_by_date = test_df.set_index('date', drop=False).sort_index()
+    
     for horizon, forecast_df in forecasts.items():
         print(f"\nEvaluating {horizon}-day forecasts...")
         
         # Filter test data to match forecast dates
-        test_dates = forecast_df['date'].unique()
-        test_subset = test_df[test_df['date'].isin(test_dates)]
+        test_dates = test_by_date.index.intersection(pd.Index(forecast_df['date'].unique()))
+        test_subset = test_by_date.loc[test_dates].reset_index(drop=True)
         
         if test_subset.empty:
             print(f"No matching test data for {horizon}-day horizon")
             continue
         
         # Evaluate by model
-        for model in forecast_df['model'].unique():
-            model_forecast = forecast_df[forecast_df['model'] == model]
-            
+        for model, model_forecast in forecast_df.groupby('model', sort=False, observed=True):
             metrics = evaluator.evaluate(test_subset, model_forecast)
             evaluation_results[f"{model}_{horizon}day"] = metrics
             
@@ -166,7 +170,7 @@ def train_and_evaluate_models(data_path=None, forecast_horizons=[7, 14], save_fo
     os.makedirs(models_dir, exist_ok=True)
     
     arima_model.save_models(f"{models_dir}/arima_models.pkl")
-    prophet_model.save_models(f"{models_dir}/prophet_models.pkl")
+    prophet_model.save_models(f"{models_dir}/prophet_models")
     lstm_model.save_models(f"{models_dir}/lstm_models")
     
     print("\nModel training and evaluation completed!")
@@ -0,0 +1,59 @@
+import multiprocessing
+import os
+import pandas as pd
+import numpy as np
+from typing import List, Optional, Tuple
+
+# Upper bound on worker processes when n_jobs is not given: every model fit also runs threaded numerical
+# code (Stan, BLAS), so one process per CPU would oversubscribe the machine
+MAX_DEFAULT_WORKERS = 4
+
+def region_slices(region: pd.Series) -> List[Tuple[object, slice]]:
+    """
+    Split a region column into one positional slice per region, without building per-group DataFrames.
+    
+    Args:
+        region: Region column of a DataFrame sorted by region
+        
+    Returns:
+        List of (region, slice) pairs in row order, skipping rows with a missing region
+    """
+    codes, uniques = pd.factorize(region, sort=False)
+    
+    if len(codes) == 0:
+        return []
+    
+    # Rows where the region changes start a new slice
+    boundaries = np.flatnonzero(np.diff(codes)) + 1
+    starts = np.concatenate([[0], boundaries])
+    stops = np.concatenate([boundaries, [len(codes)]])
+    
+    return [(uniques[codes[start]], slice(start, stop))
+            for start, stop in zip(starts.tolist(), stops.tolist()) if codes[start] >= 0]
+
+def worker_context():
+    """
+    Get the multiprocessing context for model-fitting worker pools.
+    
+    Workers are started with forkserver (spawn where it is unavailable) rather than fork, because
+    forking a process that already runs TensorFlow, OpenMP or BLAS threads can deadlock the children.
+    
+    Returns:
+        Multiprocessing context to pass as a ProcessPoolExecutor's mp_context
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return multiprocessing.get_context(method)
+
+def resolve_n_jobs(n_jobs: Optional[int]) -> int:
+    """
+    Get the number of worker processes to use.
+    
+    Args:
+        n_jobs: Requested number of worker processes, or None for the default
+        
+    Returns:
+        n_jobs if given, otherwise the CPU count capped at MAX_DEFAULT_WORKERS
+    """
+    if n_jobs is not None:
+        return n_jobs
+    return min(MAX_DEFAULT_WORKERS, os.cpu_count() or 1)